@@ -0,0 +1,953 @@
+"""Offline benchmarks for the custom command pipeline.
+
+Runs without a Discord connection by feeding synthetic messages straight into
+the cog listeners. Results are printed and can be saved as JSON to compare
+between commits:
+
+    uv run bench.py dispatch --messages 50000 --guilds 100 --output before.json
+"""
+
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from os import environ
+from statistics import quantiles
+from time import perf_counter, sleep
+import asyncio
+import json
+import logging
+import random
+import subprocess
+import tempfile
+
+from tortoise import Tortoise
+
+from core import Banshee, CustomCommand
+from core.loop import use_uvloop
+from core.ratelimit import Limits
+
+# Benchmark guild IDs start here so seeding never touches real guilds
+GUILD_OFFSET = 10**15
+
+
+class QueryCounter(logging.Handler):
+    """Counts statements logged by Tortoise's database clients."""
+
+    def __init__(self) -> None:
+        super().__init__(logging.DEBUG)
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.count += 1
+
+
+class SlowFileHandler(logging.FileHandler):
+    """Simulates a slow disk or a blocked console by stalling every write."""
+
+    def __init__(self, filename: str, delay: float) -> None:
+        super().__init__(filename, mode="w")
+        self.delay = delay
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.delay:
+            sleep(self.delay)
+        super().emit(record)
+
+
+class FakeAuthor:
+    __slots__ = ("id", "bot")
+
+    def __init__(self, id: int) -> None:
+        self.id = id
+        self.bot = False
+
+
+class FakeGuild:
+    __slots__ = ("id",)
+
+    def __init__(self, id: int) -> None:
+        self.id = id
+
+
+class FakeChannel:
+    __slots__ = ("id", "guild")
+
+    def __init__(self, id: int, guild: FakeGuild) -> None:
+        self.id = id
+        self.guild = guild
+
+    async def send(self, content: str | None = None, **kwargs) -> None:
+        FakeMessage.replies += 1
+
+
+class FakeMessage:
+    """The subset of :class:`discord.Message` the listeners read."""
+
+    __slots__ = ("id", "content", "author", "guild", "channel")
+
+    replies = 0
+
+    def __init__(
+        self, id: int, content: str, author: FakeAuthor, channel: FakeChannel
+    ) -> None:
+        self.id = id
+        self.content = content
+        self.author = author
+        self.guild = channel.guild
+        self.channel = channel
+
+    async def reply(self, content: str | None = None, **kwargs) -> None:
+        FakeMessage.replies += 1
+
+
+def command_name(index: int) -> str:
+    return f"command_{index}"
+
+
+def command_content(index: int, length: int = 0) -> str:
+    """Content of a seeded command, repeated as lines up to ``length`` if given."""
+    line = f"Content of {command_name(index)} " * 8
+    if not length:
+        return line
+    return ((line.strip() + "\n") * (length // len(line) + 1))[:length]
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict:
+    cuts = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "messages": len(latencies),
+        "elapsed_s": elapsed,
+        "messages_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_us": cuts[49] * 1_000_000,
+        "p99_us": cuts[98] * 1_000_000,
+    }
+
+
+def timings(samples: list[float]) -> dict:
+    cuts = quantiles(samples, n=100) if len(samples) > 1 else samples * 99
+    return {
+        "runs": len(samples),
+        "mean_us": sum(samples) / len(samples) * 1_000_000,
+        "p50_us": cuts[49] * 1_000_000,
+        "p99_us": cuts[98] * 1_000_000,
+    }
+
+
+async def setup_bot(database_url: str, extensions: tuple[str, ...]) -> Banshee:
+    environ["DATABASE_URL"] = database_url
+    bot = Banshee()
+    bot.load_extensions(*extensions)
+    await bot.setup_tortoise()
+    return bot
+
+
+async def seed_commands(guilds: int, commands: int, length: int = 0) -> None:
+    guild_ids = [GUILD_OFFSET + guild for guild in range(guilds)]
+    await CustomCommand.filter(discord_guild_id__in=guild_ids).delete()
+    await CustomCommand.bulk_create(
+        [
+            CustomCommand(
+                discord_guild_id=guild_id,
+                command_name=command_name(index),
+                content=command_content(index, length),
+                created_by=0,
+            )
+            for guild_id in guild_ids
+            for index in range(commands)
+        ],
+        batch_size=1000,
+    )
+
+
+async def cleanup_commands(guilds: int) -> None:
+    await CustomCommand.filter(
+        discord_guild_id__gte=GUILD_OFFSET,
+        discord_guild_id__lt=GUILD_OFFSET + guilds,
+    ).delete()
+
+
+def synthetic_messages(args) -> list[FakeMessage]:
+    rng = random.Random(args.seed)
+    channels = [
+        FakeChannel(guild, FakeGuild(GUILD_OFFSET + guild))
+        for guild in range(args.guilds)
+    ]
+    authors = [FakeAuthor(user) for user in range(100)]
+    others = ("roll", "play", "skip", "queue", "rank")
+    return [
+        FakeMessage(
+            index,
+            f"!{command_name(rng.randrange(args.commands))}"
+            if rng.random() < args.hit_ratio
+            else f"!{rng.choice(others)} {index}",
+            rng.choice(authors),
+            rng.choice(channels),
+        )
+        for index in range(args.messages)
+    ]
+
+
+async def replay(
+    cog, messages: list[FakeMessage], rate: float = 0
+) -> tuple[list[float], float]:
+    """Feed ``messages`` to the cog's listener, returning latencies and total time."""
+    interval = 1 / rate if rate else 0.0
+    latencies = []
+    started = perf_counter()
+    for index, message in enumerate(messages):
+        if interval:
+            delay = started + index * interval - perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        dispatched = perf_counter()
+        await cog.on_message(message)
+        latencies.append(perf_counter() - dispatched)
+    return latencies, perf_counter() - started
+
+
+async def bench_dispatch(args) -> dict:
+    bot = await setup_bot(args.database, ("cogs.custom_commands",))
+    try:
+        await seed_commands(args.guilds, args.commands, args.content_length)
+        if not args.cold:
+            await bot.command_cache.load()
+            await bot.limiter.load()
+        if not args.throttle:
+            bot.limiter.default = Limits(0, 0, 0, 0)
+
+        cog = bot.get_cog("CustomCommands")
+        messages = synthetic_messages(args)
+
+        counter = QueryCounter()
+        db_logger = logging.getLogger("tortoise.db_client")
+        db_logger.setLevel(logging.DEBUG)
+        db_logger.propagate = False
+        db_logger.addHandler(counter)
+
+        latencies, elapsed = await replay(cog, messages, args.rate)
+
+        db_logger.removeHandler(counter)
+        result = summarize(latencies, elapsed)
+        result["replies"] = FakeMessage.replies
+        result["throttled"] = bot.limiter.throttled
+        result["collapsed"] = bot.limiter.collapsed
+        result["db_queries"] = counter.count
+        result["db_queries_per_message"] = counter.count / len(messages)
+        result["cache"] = bot.command_cache.stats()
+        return result
+    finally:
+        await cleanup_commands(args.guilds)
+        await Tortoise.close_connections()
+
+
+class EagerLogging:
+    """Emits the original per-message debug logs, built with f-strings, before
+    handing the message to the cog."""
+
+    def __init__(self, cog) -> None:
+        self.cog = cog
+        self.logger = logging.getLogger("cogs.custom_commands")
+
+    async def on_message(self, message: FakeMessage) -> None:
+        logger = self.logger
+        logger.debug(
+            f"on_message triggered: '{message.content}' from {message.author} "
+            f"in {message.guild}"
+        )
+        logger.debug(f"Message starts with '!': '{message.content}'")
+        command_name = message.content[1:].split(" ", 1)[0]
+        logger.debug(f"Extracted command name: '{command_name}'")
+        logger.debug(
+            f"Looking up command '{command_name}' in guild {message.guild.id}"
+        )
+        await self.cog.on_message(message)
+        logger.debug(f"Reply sent for command '{command_name}'")
+
+
+async def bench_logging(args) -> dict:
+    from core.log import start_queue_logging
+
+    bot = await setup_bot(args.database, ("cogs.custom_commands",))
+    cogs_logger = logging.getLogger("cogs")
+    level = cogs_logger.level
+    try:
+        await seed_commands(args.guilds, args.commands)
+        await bot.command_cache.load()
+        bot.limiter.default = Limits(0, 0, 0, 0)
+        cog = bot.get_cog("CustomCommands")
+        messages = synthetic_messages(args)
+
+        with tempfile.TemporaryDirectory() as directory:
+
+            def file_handler() -> logging.Handler:
+                handler = SlowFileHandler(
+                    f"{directory}/bench.log", args.write_delay / 1000
+                )
+                handler.setFormatter(
+                    logging.Formatter("[%(asctime)s %(levelname)s] %(name)s: %(message)s")
+                )
+                return handler
+
+            async def run(mode: str) -> dict:
+                listener = None
+                handler = file_handler()
+                cog.logger.limit.rate = args.debug_rate if mode == "sampled" else 0
+                if mode == "disabled":
+                    cogs_logger.setLevel(logging.INFO)
+                elif mode in ("original", "direct"):
+                    # Previous setup: the handler writes on the event loop
+                    cogs_logger.setLevel(logging.DEBUG)
+                    cogs_logger.addHandler(handler)
+                else:
+                    listener = start_queue_logging(
+                        [handler],
+                        loggers=("cogs",),
+                        level=logging.DEBUG,
+                    )
+
+                target = EagerLogging(cog) if mode == "original" else cog
+                latencies, elapsed = await replay(target, messages)
+                if listener is not None:
+                    drained = perf_counter()
+                    listener.stop()
+                    drain = perf_counter() - drained
+                cogs_logger.handlers.clear()
+                handler.close()
+
+                result = summarize(latencies, elapsed)
+                if listener is not None:
+                    result["drain_s"] = drain
+                return result
+
+            # Warm up caches and code paths before measuring
+            await run("disabled")
+            # The fastest of several runs per mode keeps noise out of the comparison
+            results = {
+                mode: min(
+                    [await run(mode) for _ in range(args.repeat)],
+                    key=lambda result: result["elapsed_s"],
+                )
+                for mode in ("disabled", "original", "direct", "queued", "sampled")
+            }
+
+        baseline = results["disabled"]["elapsed_s"]
+        for result in results.values():
+            # Below the baseline is noise, not logging making messages faster
+            result["logging_us_per_message"] = max(
+                0.0, (result["elapsed_s"] - baseline) / len(messages) * 1_000_000
+            )
+        return results
+    finally:
+        cogs_logger.setLevel(level)
+        await cleanup_commands(args.guilds)
+        await Tortoise.close_connections()
+
+
+async def bench_search(args) -> dict:
+    bot = await setup_bot(args.database, ("cogs.custom_commands",))
+    try:
+        rng = random.Random(args.seed)
+        vocabulary = [f"word{index}" for index in range(args.vocabulary)]
+        guild_id = GUILD_OFFSET
+        await cleanup_commands(1)
+        await CustomCommand.bulk_create(
+            [
+                CustomCommand(
+                    discord_guild_id=guild_id,
+                    command_name=command_name(index),
+                    content=" ".join(rng.choices(vocabulary, k=40)),
+                    created_by=0,
+                )
+                for index in range(args.commands)
+            ],
+            batch_size=1000,
+        )
+        queries = [
+            " ".join(rng.sample(vocabulary, rng.randint(1, 3)))
+            for _ in range(args.repeat)
+        ]
+
+        async def measure(search) -> dict:
+            samples = []
+            for query in queries:
+                started = perf_counter()
+                await search(query)
+                samples.append(perf_counter() - started)
+            return timings(samples)
+
+        # Previous approach: scan every command's content
+        async def scan(query: str) -> None:
+            commands = CustomCommand.filter(discord_guild_id=guild_id)
+            for word in query.split():
+                commands = commands.filter(content__icontains=word)
+            await commands.values_list("command_name", "content")
+
+        results = {"scan": await measure(scan)}
+        if bot.search.backend != "memory":
+            results[bot.search.backend] = await measure(
+                lambda query: bot.search.search(guild_id, query)
+            )
+
+        bot.search.backend = "memory"
+        started = perf_counter()
+        await bot.search.load_guild(guild_id)
+        build = perf_counter() - started
+        results["memory"] = await measure(
+            lambda query: bot.search.search(guild_id, query)
+        )
+        results["memory"]["build_ms"] = build * 1000
+        return {"commands": args.commands, **results}
+    finally:
+        await cleanup_commands(1)
+        await Tortoise.close_connections()
+
+
+class StubBattleNet:
+    """A local stand-in for the Battle.net API with ETag support."""
+
+    def __init__(self, guilds: int, members: int) -> None:
+        self.rosters = {
+            f"guild-{guild}": [
+                {
+                    "character": {
+                        "id": guild * 100_000 + member,
+                        "name": f"Character{guild}x{member}",
+                        "realm": {"slug": "stub-realm"},
+                        "level": 80,
+                        "playable_class": {"id": member % 13 + 1},
+                        "playable_race": {"id": member % 10 + 1},
+                    },
+                    "rank": member % 10,
+                }
+                for member in range(members)
+            ]
+            for guild in range(guilds)
+        }
+        self.item_levels: dict[str, int] = {}
+        self.requests = 0
+
+    def respond(self, request, payload: dict):
+        from aiohttp import web
+
+        self.requests += 1
+        body = json.dumps(payload)
+        etag = f'"{hash(body) & 0xFFFFFFFF:x}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(
+            text=body, content_type="application/json", headers={"ETag": etag}
+        )
+
+    async def token(self, request):
+        from aiohttp import web
+
+        return web.json_response({"access_token": "stub", "expires_in": 86400})
+
+    async def roster(self, request):
+        from aiohttp import web
+
+        members = self.rosters.get(request.match_info["guild"])
+        if members is None:
+            return web.Response(status=404)
+        return self.respond(request, {"members": members})
+
+    async def character(self, request):
+        name = request.match_info["name"]
+        return self.respond(
+            request,
+            {
+                "name": name,
+                "equipped_item_level": self.item_levels.get(name, 600),
+                "last_login_timestamp": 1_700_000_000_000,
+            },
+        )
+
+    async def start(self):
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_post("/token", self.token)
+        app.router.add_get("/data/wow/guild/{realm}/{guild}/roster", self.roster)
+        app.router.add_get("/profile/wow/character/{realm}/{name}", self.character)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return runner, f"http://127.0.0.1:{port}"
+
+
+async def bench_roster(args) -> dict:
+    import aiohttp
+
+    from core import ApiResponse, GuildMember, GuildSettings
+    from core.blizzard import BlizzardClient
+    from core.roster import RosterSync
+
+    stub = StubBattleNet(args.guilds, args.members)
+    runner, url = await stub.start()
+    await setup_bot(args.database, ())
+    guild_ids = [GUILD_OFFSET + guild for guild in range(args.guilds)]
+    try:
+        await GuildSettings.bulk_create(
+            [
+                GuildSettings(
+                    discord_guild_id=guild_id,
+                    wow_guild_name=f"Guild {index}",
+                    wow_region="us",
+                    wow_realm="Stub Realm",
+                )
+                for index, guild_id in enumerate(guild_ids)
+            ]
+        )
+        async with aiohttp.ClientSession() as session:
+            client = BlizzardClient(
+                session,
+                "client",
+                "secret",
+                api_url=url,
+                oauth_url=f"{url}/token",
+                concurrency=args.concurrency,
+            )
+            sync = RosterSync(client, profile_max_age=args.profile_max_age)
+
+            async def run(name: str) -> dict:
+                requests, not_modified = client.requests, client.not_modified
+                counter = QueryCounter()
+                db_logger = logging.getLogger("tortoise.db_client")
+                db_logger.setLevel(logging.DEBUG)
+                db_logger.propagate = False
+                db_logger.addHandler(counter)
+
+                started = perf_counter()
+                diffs = await sync.sync_all()
+                elapsed = perf_counter() - started
+                db_logger.removeHandler(counter)
+                return {
+                    "run": name,
+                    "elapsed_s": elapsed,
+                    "requests": client.requests - requests,
+                    "not_modified": client.not_modified - not_modified,
+                    "db_queries": counter.count,
+                    "added": sum(diff.added for diff in diffs.values()),
+                    "removed": sum(diff.removed for diff in diffs.values()),
+                    "changed": sum(diff.changed for diff in diffs.values()),
+                }
+
+            runs = [await run("initial"), await run("unchanged")]
+
+            # One member leaves and one gets new gear in every guild
+            for members in stub.rosters.values():
+                members.pop()
+                stub.item_levels[members[0]["character"]["name"].lower()] = 610
+            runs.append(await run("changed"))
+
+        return {"guilds": args.guilds, "members": args.members, "runs": runs}
+    finally:
+        await GuildMember.filter(discord_guild_id__in=guild_ids).delete()
+        await GuildSettings.filter(discord_guild_id__in=guild_ids).delete()
+        # Only the responses cached from the stub, keyed by its realm
+        for prefix in (
+            "us:/data/wow/guild/stub-realm/",
+            "us:/profile/wow/character/stub-realm/",
+        ):
+            await ApiResponse.filter(key__startswith=prefix).delete()
+        await Tortoise.close_connections()
+        await runner.cleanup()
+
+
+async def bench_schedule(args) -> dict:
+    import tracemalloc
+
+    from core import Announcement, GuildSettings
+    from core.scheduler import AnnouncementScheduler
+
+    rng = random.Random(args.seed)
+    await setup_bot(args.database, ())
+    guild_ids = [GUILD_OFFSET + guild for guild in range(args.guilds)]
+    week = 7 * 86400
+    now = datetime.now(timezone.utc).timestamp()
+    try:
+        await GuildSettings.bulk_create(
+            [GuildSettings(discord_guild_id=guild_id) for guild_id in guild_ids]
+        )
+        settings = await GuildSettings.filter(discord_guild_id__in=guild_ids)
+        intervals = (3600, 86400, week)
+
+        started = perf_counter()
+        announcements = []
+        for index in range(args.announcements):
+            interval = rng.choice(intervals)
+            if rng.random() < args.overdue:
+                # Missed while the bot was down, possibly several runs ago
+                next_run = now - rng.uniform(0, 3 * interval)
+            else:
+                next_run = now + rng.uniform(0, week)
+            announcements.append(
+                Announcement(
+                    guild=settings[index % len(settings)],
+                    channel_id=index,
+                    content=f"Announcement {index}",
+                    interval_minutes=interval // 60,
+                    next_run_at=datetime.fromtimestamp(next_run, timezone.utc),
+                    created_by=0,
+                )
+            )
+        await Announcement.bulk_create(announcements, batch_size=1000)
+        seed_elapsed = perf_counter() - started
+        del announcements
+
+        async def send(channel_id: int, content: str) -> bool:
+            return True
+
+        scheduler = AnnouncementScheduler(send, horizon=args.horizon, send_rate=0)
+
+        tracemalloc.start()
+        started = perf_counter()
+        await scheduler.load(now)
+        load_elapsed = perf_counter() - started
+        window_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        window = len(scheduler)
+
+        # The first tick sends everything that was missed, once per announcement
+        started = perf_counter()
+        overdue = await scheduler.tick(now)
+        catch_up = {
+            "elapsed_s": perf_counter() - started,
+            "sent": len(overdue),
+            "coalesced_runs": scheduler.coalesced,
+        }
+
+        # Then an hour of minute ticks, refilling the window as it drains
+        ticks, sent = [], 0
+        for minute in range(1, 61):
+            started = perf_counter()
+            sent += len(await scheduler.tick(now + minute * 60))
+            ticks.append(perf_counter() - started)
+
+        # Previous approach: one sleeping task per announcement
+        async def sleeper(delay: float) -> None:
+            while True:
+                await asyncio.sleep(delay)
+
+        delays = [rng.uniform(0, week) for _ in range(args.announcements)]
+        tracemalloc.start()
+        started = perf_counter()
+        tasks = [asyncio.create_task(sleeper(delay)) for delay in delays]
+        await asyncio.sleep(0)
+        task_elapsed = perf_counter() - started
+        task_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        return {
+            "announcements": args.announcements,
+            "seed_s": seed_elapsed,
+            "scheduler": {
+                "window": window,
+                "load_s": load_elapsed,
+                "memory_kb": window_memory / 1024,
+                "catch_up": catch_up,
+                "hour": {**timings(ticks), "sent": sent},
+            },
+            "task_per_announcement": {
+                "tasks": len(tasks),
+                "create_s": task_elapsed,
+                "memory_kb": task_memory / 1024,
+            },
+        }
+    finally:
+        await GuildSettings.filter(discord_guild_id__in=guild_ids).delete()
+        await Tortoise.close_connections()
+
+
+async def bench_replica(args) -> dict:
+    import sqlite3
+    from pathlib import Path
+
+    from tortoise import connections
+
+    directory = tempfile.TemporaryDirectory()
+    primary_path = Path(directory.name, "primary.db")
+    replica_path = Path(directory.name, "replica.db")
+    environ["DATABASE_READ_URL"] = f"sqlite://{replica_path}"
+    environ["DATABASE_READ_MAX_LAG"] = str(args.max_lag)
+    environ["DATABASE_READ_CHECK_INTERVAL"] = str(args.max_lag / 2)
+
+    def replicate() -> None:
+        # Stands in for streaming replication by copying the whole file
+        with sqlite3.connect(primary_path) as source, sqlite3.connect(
+            replica_path
+        ) as target:
+            source.backup(target)
+
+    async def replicator() -> None:
+        while True:
+            await asyncio.to_thread(replicate)
+            await asyncio.sleep(args.max_lag / 5)
+
+    bot = await setup_bot(f"sqlite://{primary_path}", ())
+    replica = bot.replica
+    rng = random.Random(args.seed)
+    replication = asyncio.create_task(replicator())
+    try:
+        await seed_commands(args.guilds, args.commands)
+
+        async def run(name: str) -> dict:
+            reads, primary_reads = replica.reads, replica.primary_reads
+            started = perf_counter()
+            for _ in range(args.lookups):
+                await CustomCommand.get_or_none(
+                    discord_guild_id=GUILD_OFFSET + rng.randrange(args.guilds),
+                    command_name=command_name(rng.randrange(args.commands)),
+                )
+            return {
+                "phase": name,
+                "healthy": replica.healthy,
+                "lag_s": replica.lag,
+                "replica_reads": replica.reads - reads,
+                "primary_reads": replica.primary_reads - primary_reads,
+                "lookup_us": (perf_counter() - started) / args.lookups * 1_000_000,
+            }
+
+        # Let the replica catch up with the seeded commands first
+        await asyncio.sleep(args.max_lag + replica.interval)
+        phases = [await run("replicating")]
+
+        # A created command is readable at once, since reads are pinned
+        await CustomCommand.create(
+            discord_guild_id=GUILD_OFFSET, command_name="fresh", content="", created_by=0
+        )
+        found = await CustomCommand.exists(
+            discord_guild_id=GUILD_OFFSET, command_name="fresh"
+        )
+        phases.append({**await run("after write"), "read_own_write": found})
+
+        replication.cancel()
+        await asyncio.sleep(args.max_lag + 2 * replica.interval)
+        phases.append(await run("replication stopped"))
+
+        await connections.get("replica").close()
+        replica_path.unlink()
+        await replica.check()
+        phases.append(await run("replica down"))
+
+        return {"max_lag_s": args.max_lag, "phases": phases}
+    finally:
+        replication.cancel()
+        bot.check_replica.cancel()
+        await Tortoise.close_connections()
+        directory.cleanup()
+
+
+async def bench_list(args) -> dict:
+    from cogs.custom_commands import CommandListView
+
+    await setup_bot(args.database, ("cogs.custom_commands",))
+    try:
+        await seed_commands(1, args.commands)
+        guild_id = GUILD_OFFSET
+
+        # Previous implementation: load every full row, then join all names
+        full_scan = []
+        for _ in range(args.repeat):
+            started = perf_counter()
+            rows = await CustomCommand.filter(discord_guild_id=guild_id).all()
+            ", ".join(f"`!{row.command_name}`" for row in rows)
+            full_scan.append(perf_counter() - started)
+
+        # Paginated: count plus the first page of names only
+        first_page = []
+        for _ in range(args.repeat):
+            started = perf_counter()
+            total = await CustomCommand.filter(discord_guild_id=guild_id).count()
+            view = CommandListView(guild_id, total)
+            await view.load(None)
+            view.embed()
+            first_page.append(perf_counter() - started)
+
+        # Keyset pages cost the same deep into the list
+        pages = []
+        while view.has_next:
+            view.cursors.append(view.names[-1])
+            started = perf_counter()
+            await view.load(view.cursors[-1])
+            pages.append(perf_counter() - started)
+
+        return {
+            "commands": args.commands,
+            "full_scan": timings(full_scan),
+            "first_page": timings(first_page),
+            "next_page": timings(pages) if pages else None,
+        }
+    finally:
+        await cleanup_commands(1)
+        await Tortoise.close_connections()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(prog="Banshee benchmarks")
+    parser.add_argument(
+        "--database",
+        default=environ.get("DATABASE_URL", "sqlite://:memory:"),
+        help="database URL (default: $DATABASE_URL or in-memory SQLite)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument(
+        "--uvloop", action="store_true", help="run the benchmark on uvloop"
+    )
+    parser.add_argument("-o", "--output", help="write results to this JSON file")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    dispatch = subparsers.add_parser(
+        "dispatch", help="replay synthetic messages through on_message"
+    )
+    dispatch.add_argument("--messages", type=int, default=20_000)
+    dispatch.add_argument(
+        "--rate", type=float, default=0, help="messages per second (0 = unpaced)"
+    )
+    dispatch.add_argument(
+        "--hit-ratio",
+        type=float,
+        default=0.2,
+        help="fraction of triggers that match a custom command",
+    )
+    dispatch.add_argument("--guilds", type=int, default=100)
+    dispatch.add_argument("--commands", type=int, default=50, help="per guild")
+    dispatch.add_argument(
+        "--content-length",
+        type=int,
+        default=0,
+        help="seed commands with this many characters of content",
+    )
+    dispatch.add_argument(
+        "--cold", action="store_true", help="skip the startup cache load"
+    )
+    dispatch.add_argument(
+        "--throttle", action="store_true", help="apply the default reply limits"
+    )
+    dispatch.set_defaults(run=bench_dispatch)
+
+    logs = subparsers.add_parser(
+        "logging",
+        help="compare event loop time spent logging per-message debug records",
+    )
+    logs.add_argument("--messages", type=int, default=20_000)
+    logs.add_argument(
+        "--hit-ratio",
+        type=float,
+        default=1.0,
+        help="fraction of triggers that match a custom command (and log)",
+    )
+    logs.add_argument("--guilds", type=int, default=100)
+    logs.add_argument("--commands", type=int, default=50, help="per guild")
+    logs.add_argument(
+        "--debug-rate",
+        type=float,
+        default=10,
+        help="debug records per second and message kept when sampled",
+    )
+    logs.add_argument(
+        "--write-delay",
+        type=float,
+        default=0.05,
+        help="milliseconds each log write stalls, to simulate slow disks",
+    )
+    logs.add_argument("--repeat", type=int, default=3, help="runs per mode")
+    logs.set_defaults(run=bench_logging)
+
+    searching = subparsers.add_parser(
+        "search", help="compare /newcommand search backends for one large guild"
+    )
+    searching.add_argument("--commands", type=int, default=10_000)
+    searching.add_argument(
+        "--vocabulary", type=int, default=2000, help="distinct words in content"
+    )
+    searching.add_argument("--repeat", type=int, default=50)
+    searching.set_defaults(run=bench_search)
+
+    roster = subparsers.add_parser(
+        "roster", help="sync WoW guild rosters from a local stub Battle.net API"
+    )
+    roster.add_argument("--guilds", type=int, default=20)
+    roster.add_argument("--members", type=int, default=200, help="per guild")
+    roster.add_argument(
+        "--concurrency", type=int, default=10, help="requests in flight per region"
+    )
+    roster.add_argument(
+        "--profile-max-age",
+        type=float,
+        default=0,
+        help="seconds before profiles are requested again (0 = every sync)",
+    )
+    roster.set_defaults(run=bench_roster)
+
+    schedule = subparsers.add_parser(
+        "schedule", help="measure announcement scheduler overhead"
+    )
+    schedule.add_argument("--announcements", type=int, default=100_000)
+    schedule.add_argument("--guilds", type=int, default=1000)
+    schedule.add_argument(
+        "--overdue",
+        type=float,
+        default=0.01,
+        help="fraction of announcements missed while offline",
+    )
+    schedule.add_argument(
+        "--horizon", type=float, default=600, help="seconds of runs kept in memory"
+    )
+    schedule.set_defaults(run=bench_schedule)
+
+    replica = subparsers.add_parser(
+        "replica",
+        help="route reads to a replica SQLite file kept in sync by copying",
+    )
+    replica.add_argument("--guilds", type=int, default=100)
+    replica.add_argument("--commands", type=int, default=50, help="per guild")
+    replica.add_argument("--lookups", type=int, default=2000, help="per phase")
+    replica.add_argument(
+        "--max-lag", type=float, default=1.0, help="seconds before falling back"
+    )
+    replica.set_defaults(run=bench_replica)
+
+    listing = subparsers.add_parser(
+        "list", help="compare /newcommand list strategies for one large guild"
+    )
+    listing.add_argument("--commands", type=int, default=10_000)
+    listing.add_argument("--repeat", type=int, default=20)
+    listing.set_defaults(run=bench_list)
+
+    args = parser.parse_args()
+    if args.uvloop:
+        use_uvloop()
+    result = asyncio.run(args.run(args))
+
+    report = {
+        "benchmark": args.benchmark,
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "parameters": {
+            key: value for key, value in vars(args).items() if key != "run"
+        },
+        "result": result,
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
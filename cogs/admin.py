@@ -0,0 +1,46 @@
+import discord
+from discord.ext import commands
+
+from core import Cog, Context
+from core.render import format_seconds
+
+
+class Admin(Cog):
+    """Commands for the bot owner."""
+
+    async def extension_autocomplete(self, ctx: discord.AutocompleteContext):
+        """Suggest loaded extensions."""
+        value = (ctx.value or "").lower()
+        return [name for name in self.bot.extensions if value in name][:25]
+
+    @discord.slash_command(
+        name="reload",
+        description="Reload a bot extension in place",
+        contexts={discord.InteractionContextType.guild},
+        default_member_permissions=discord.Permissions(administrator=True),
+    )
+    @discord.option(
+        "extension",
+        str,
+        description="The extension to reload, e.g. cogs.custom_commands",
+        required=True,
+        autocomplete=extension_autocomplete,
+    )
+    @commands.is_owner()
+    async def reload(self, ctx: Context, extension: str):
+        """Reload an extension without reconnecting to the gateway."""
+        if extension not in self.bot.extensions:
+            return await ctx.error(
+                "Unknown Extension", f"`{extension}` is not loaded.", ephemeral=True
+            )
+
+        elapsed = self.bot.reload(extension)
+        await ctx.success(
+            "Extension Reloaded",
+            f"Reloaded `{extension}` in {format_seconds(elapsed)}.",
+            ephemeral=True,
+        )
+
+
+def setup(bot):
+    bot.add_cog(Admin(bot))
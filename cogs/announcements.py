@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta, timezone
+
+import discord
+from discord.commands import SlashCommandGroup
+
+from core import Announcement, Cog, Context, GuildSettings
+from core.scheduler import next_run_after
+
+MAX_ANNOUNCEMENTS = 25
+START_FORMAT = "%Y-%m-%d %H:%M"
+
+
+class Announcements(Cog):
+    """Commands for scheduling recurring announcements."""
+
+    announce = SlashCommandGroup(
+        "announce",
+        "Manage recurring announcements",
+        contexts={discord.InteractionContextType.guild},
+        default_member_permissions=discord.Permissions(administrator=True),
+    )
+
+    @announce.command(name="add", description="Post a message on a schedule")
+    @discord.option(
+        "channel", discord.TextChannel, description="The channel to post in"
+    )
+    @discord.option(
+        "every",
+        int,
+        description="Hours between posts, e.g. 168 for weekly",
+        min_value=1,
+        max_value=24 * 28,
+    )
+    @discord.option(
+        "content", str, description="The message to post", max_length=2000
+    )
+    @discord.option(
+        "start",
+        str,
+        description="First post in UTC as YYYY-MM-DD HH:MM (default: one interval from now)",
+        required=False,
+        default=None,
+    )
+    async def add_announcement(
+        self,
+        ctx: Context,
+        channel: discord.TextChannel,
+        every: int,
+        content: str,
+        start: str | None,
+    ):
+        """Schedule a recurring announcement."""
+        assert ctx.guild
+        interval = timedelta(hours=every)
+        now = datetime.now(timezone.utc)
+
+        if start is None:
+            first_run = now + interval
+        else:
+            try:
+                first_run = datetime.strptime(start, START_FORMAT).replace(
+                    tzinfo=timezone.utc
+                )
+            except ValueError:
+                return await ctx.error(
+                    "Invalid Start Time",
+                    "Use the format `YYYY-MM-DD HH:MM` in UTC, e.g. `2025-01-07 19:30`.",
+                    ephemeral=True,
+                )
+            first_run = next_run_after(first_run, interval, now)
+
+        settings, _ = await GuildSettings.get_or_create(discord_guild_id=ctx.guild.id)
+        if await Announcement.filter(guild=settings).count() >= MAX_ANNOUNCEMENTS:
+            return await ctx.error(
+                "Too Many Announcements",
+                f"A server can have up to {MAX_ANNOUNCEMENTS} announcements. "
+                "Remove one with `/announce remove` first.",
+                ephemeral=True,
+            )
+
+        announcement = await Announcement.create(
+            guild=settings,
+            channel_id=channel.id,
+            content=content,
+            interval_minutes=every * 60,
+            next_run_at=first_run,
+            created_by=ctx.author.id,
+        )
+        self.bot.scheduler.schedule(announcement, ctx.guild.id)
+
+        await ctx.success(
+            "Announcement Scheduled",
+            f"Posting in {channel.mention} every **{every}h**, "
+            f"next {discord.utils.format_dt(first_run, 'R')} "
+            f"(ID `{announcement.id}`).",
+            ephemeral=True,
+        )
+
+    @announce.command(name="list", description="List scheduled announcements")
+    async def list_announcements(self, ctx: Context):
+        """List this server's announcements."""
+        assert ctx.guild
+        announcements = await Announcement.filter(
+            guild__discord_guild_id=ctx.guild.id
+        ).order_by("next_run_at")
+
+        if not announcements:
+            return await ctx.info(
+                "No Announcements",
+                "No announcements scheduled yet. Use `/announce add` to create one.",
+                ephemeral=True,
+            )
+
+        embed = discord.Embed(
+            title="Scheduled Announcements", color=discord.Color.blurple()
+        )
+        for announcement in announcements:
+            status = (
+                f"next {discord.utils.format_dt(announcement.next_run_at, 'R')}"
+                if announcement.enabled
+                else "disabled, channel is gone"
+            )
+            embed.add_field(
+                name=f"#{announcement.id} - every {announcement.interval_minutes // 60}h",
+                value=f"<#{announcement.channel_id}>, {status}\n"
+                f"{discord.utils.remove_markdown(announcement.content)[:100]}",
+                inline=False,
+            )
+        await ctx.respond(embed=embed, ephemeral=True)
+
+    @announce.command(name="remove", description="Remove a scheduled announcement")
+    @discord.option("id", int, description="The announcement ID from /announce list")
+    async def remove_announcement(self, ctx: Context, id: int):
+        """Remove an announcement."""
+        assert ctx.guild
+        # Deletes cannot filter across the join, so resolve the guild first
+        settings = await GuildSettings.get_or_none(discord_guild_id=ctx.guild.id)
+        deleted = settings and await Announcement.filter(
+            id=id, guild_id=settings.id
+        ).delete()
+        if not deleted:
+            return await ctx.error(
+                "Announcement Not Found",
+                f"No announcement with ID `{id}` exists in this server.",
+                ephemeral=True,
+            )
+
+        self.bot.scheduler.unschedule(id)
+        await ctx.success(
+            "Announcement Removed", f"Announcement `{id}` has been removed.", ephemeral=True
+        )
+
+
+def setup(bot):
+    bot.add_cog(Announcements(bot))
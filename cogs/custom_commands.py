@@ -1,16 +1,76 @@
+import heapq
+import io
+import json
 import logging
 import re
+from os import getenv
+from time import perf_counter
 
 import discord
 from discord.commands import SlashCommandGroup
 from discord.ext import commands
+from discord.utils import utcnow
+from tortoise.exceptions import IntegrityError
+from tortoise.transactions import in_transaction
+
+from core import Cog, CommandUsage, Context, CustomCommand
+from core.log import RateLimitedLogger
+
+COMMAND_NAME = re.compile(r"^[a-z0-9_]+$")
+MAX_CONTENT_LENGTH = 4000
+MAX_IMPORT_SIZE = 8 * 1024 * 1024
+EXPORT_VERSION = 1
+EXPORT_PAGE_SIZE = 500
+# Seconds a form or confirmation stays open; long enough to write content
+MODAL_TIMEOUT = 600
+CONFIRM_TIMEOUT = 30
+LIST_TIMEOUT = 120
+
+
+def parse_export(data: bytes) -> dict[str, str]:
+    """Validate an export file and return its commands by name."""
+    try:
+        payload = json.loads(data)
+    except (UnicodeDecodeError, json.JSONDecodeError) as error:
+        raise ValueError("The file is not valid JSON.") from error
+
+    entries = payload.get("commands") if isinstance(payload, dict) else None
+    if not isinstance(entries, list):
+        raise ValueError("Expected an object with a `commands` list.")
+
+    commands_data: dict[str, str] = {}
+    for index, entry in enumerate(entries, 1):
+        if not (
+            isinstance(entry, dict)
+            and isinstance(entry.get("name"), str)
+            and isinstance(entry.get("content"), str)
+        ):
+            raise ValueError(f"Entry {index} needs a `name` and a `content` string.")
+
+        name = entry["name"].lower().strip()
+        content = entry["content"]
+        if len(name) > 50 or not COMMAND_NAME.match(name):
+            raise ValueError(
+                f"Entry {index}: command names can only contain lowercase letters, "
+                "numbers, and underscores."
+            )
+        if not content or len(content) > MAX_CONTENT_LENGTH:
+            raise ValueError(
+                f"Entry {index}: content must be 1 to {MAX_CONTENT_LENGTH} characters."
+            )
+        if name in commands_data:
+            raise ValueError(f"`{name}` appears more than once.")
+        commands_data[name] = content
 
-from core import Cog, Context, CustomCommand
+    if not commands_data:
+        raise ValueError("The file contains no commands.")
+    return commands_data
 
 
 class CustomCommandModal(discord.ui.Modal):
     command_name: str
     content: str
+    submitted = False
 
     def __init__(self, title: str, name_value: str = "", content_value: str = ""):
         super().__init__(title=title)
@@ -29,7 +89,7 @@ class CustomCommandModal(discord.ui.Modal):
                 placeholder="Enter the markdown content for this command...",
                 value=content_value,
                 style=discord.InputTextStyle.long,
-                max_length=4000,
+                max_length=MAX_CONTENT_LENGTH,
                 required=True,
             )
         )
@@ -38,12 +98,13 @@ class CustomCommandModal(discord.ui.Modal):
         # Store the values for later use
         self.command_name = self.children[0].value or ""
         self.content = self.children[1].value or ""
+        self.submitted = True
         await interaction.response.defer()
 
 
 class ConfirmDeleteView(discord.ui.View):
     def __init__(self, command_name: str):
-        super().__init__(timeout=30)
+        super().__init__(timeout=CONFIRM_TIMEOUT)
         self.command_name = command_name
         self.confirmed = False
 
@@ -62,12 +123,82 @@ class ConfirmDeleteView(discord.ui.View):
         self.stop()
 
 
+class CommandListView(discord.ui.View):
+    """Pages through a guild's command names, loading each page on demand.
+
+    Pages are fetched with keyset pagination on the (guild, name) index, so
+    every page costs the same no matter how far in it is.
+    """
+
+    page_size = 50
+
+    def __init__(self, guild_id: int, total: int):
+        super().__init__(timeout=LIST_TIMEOUT)
+        self.guild_id = guild_id
+        self.total = total
+        # The name each visited page starts after; None for the first page
+        self.cursors: list[str | None] = []
+        self.names: list[str] = []
+        self.has_next = False
+
+    async def load(self, after: str | None):
+        query = CustomCommand.filter(discord_guild_id=self.guild_id)
+        if after is not None:
+            query = query.filter(command_name__gt=after)
+
+        # One extra row tells whether there is a next page
+        names = await query.order_by("command_name").limit(
+            self.page_size + 1
+        ).values_list("command_name", flat=True)
+        self.names = list(names[: self.page_size])
+        self.has_next = len(names) > self.page_size
+        self.previous_button.disabled = len(self.cursors) == 0
+        self.next_button.disabled = not self.has_next
+
+    def embed(self) -> discord.Embed:
+        pages = -(-self.total // self.page_size)
+        embed = discord.Embed(
+            title=f"Custom Commands ({self.total})",
+            description=", ".join(f"`!{name}`" for name in self.names),
+            color=discord.Color.blurple(),
+        )
+        embed.set_footer(text=f"Page {len(self.cursors) + 1} of {pages}")
+        return embed
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous_button(
+        self, button: discord.ui.Button, interaction: discord.Interaction
+    ):
+        self.cursors.pop()
+        await self.load(self.cursors[-1] if self.cursors else None)
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next_button(
+        self, button: discord.ui.Button, interaction: discord.Interaction
+    ):
+        self.cursors.append(self.names[-1])
+        await self.load(self.cursors[-1])
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    @discord.ui.button(label="Close", style=discord.ButtonStyle.secondary)
+    async def close_button(
+        self, button: discord.ui.Button, interaction: discord.Interaction
+    ):
+        # Stopping ends the session, freeing its slot before the timeout
+        self.stop()
+        await interaction.response.edit_message(embed=self.embed(), view=None)
+
+
 class CustomCommands(Cog):
     """Commands for managing custom guild commands."""
 
     def __init__(self, bot):
         super().__init__(bot)
-        self.logger = logging.getLogger(__name__)
+        # Per-message debug logs can be sampled so they can stay on under load
+        self.logger = RateLimitedLogger(
+            logging.getLogger(__name__), float(getenv("LOG_DEBUG_RATE", 0))
+        )
 
     newcommand = SlashCommandGroup(
         "newcommand",
@@ -76,42 +207,54 @@ class CustomCommands(Cog):
         default_member_permissions=discord.Permissions(administrator=True),
     )
 
+    async def command_name_autocomplete(self, ctx: discord.AutocompleteContext):
+        """Suggest command names from the in-memory prefix index."""
+        guild_id = ctx.interaction.guild_id
+        if guild_id is None:
+            return []
+        return await self.bot.command_cache.complete(
+            guild_id, (ctx.value or "").lower().strip()
+        )
+
     @newcommand.command(name="create", description="Create a new custom command")
     async def create_command(self, ctx: Context):
         """Create a new custom command using a modal."""
         assert ctx.guild
 
         modal = CustomCommandModal(title="Create Custom Command")
-        await ctx.send_modal(modal)
-        await modal.wait()
+        with self.bot.sessions.open(
+            modal, ctx.guild.id, ctx.author.id, MODAL_TIMEOUT
+        ) as session:
+            await ctx.send_modal(modal)
+            await session.wait()
+        if not modal.submitted:
+            return
 
         # Validate command name
         command_name = modal.command_name.lower().strip()
-        if not re.match(r"^[a-z0-9_]+$", command_name):
+        if not COMMAND_NAME.match(command_name):
             return await ctx.error(
                 "Invalid Command Name",
                 "Command names can only contain lowercase letters, numbers, and underscores.",
                 ephemeral=True,
             )
 
-        # Check for duplicate
-        existing = await CustomCommand.get_or_none(
-            discord_guild_id=ctx.guild.id, command_name=command_name
-        )
-        if existing:
+        # The (guild, name) unique constraint rejects duplicates
+        try:
+            await CustomCommand.create(
+                discord_guild_id=ctx.guild.id,
+                command_name=command_name,
+                content=modal.content,
+                created_by=ctx.author.id,
+            )
+        except IntegrityError:
             return await ctx.error(
                 "Command Already Exists",
                 f"A command named `{command_name}` already exists. Use `/newcommand edit` to modify it.",
                 ephemeral=True,
             )
-
-        # Create the command
-        await CustomCommand.create(
-            discord_guild_id=ctx.guild.id,
-            command_name=command_name,
-            content=modal.content,
-            created_by=ctx.author.id,
-        )
+        self.bot.command_cache.set(ctx.guild.id, command_name, modal.content)
+        self.bot.search.set(ctx.guild.id, command_name, modal.content)
 
         await ctx.success(
             "Command Created",
@@ -124,32 +267,31 @@ class CustomCommands(Cog):
         """List all custom commands for this guild."""
         assert ctx.guild
 
-        commands_list = await CustomCommand.filter(
-            discord_guild_id=ctx.guild.id
-        ).all()
-
-        if not commands_list:
+        total = await CustomCommand.filter(discord_guild_id=ctx.guild.id).count()
+        if not total:
             return await ctx.info(
                 "No Custom Commands",
                 "No custom commands have been created yet. Use `/newcommand create` to add one.",
                 ephemeral=True,
             )
 
-        embed = discord.Embed(
-            title=f"Custom Commands ({len(commands_list)})",
-            color=discord.Color.blurple(),
-        )
-
-        command_names = [f"`!{cmd.command_name}`" for cmd in commands_list]
-        embed.description = ", ".join(command_names)
-
-        await ctx.respond(embed=embed, ephemeral=True)
+        view = CommandListView(ctx.guild.id, total)
+        with self.bot.sessions.open(
+            view, ctx.guild.id, ctx.author.id, LIST_TIMEOUT, readonly=True
+        ) as session:
+            await view.load(None)
+            await ctx.respond(embed=view.embed(), view=view, ephemeral=True)
+            await session.wait()
 
     @newcommand.command(
         name="view", description="View the content of a custom command"
     )
     @discord.option(
-        "name", str, description="The name of the command to view", required=True
+        "name",
+        str,
+        description="The name of the command to view",
+        required=True,
+        autocomplete=command_name_autocomplete,
     )
     async def view_command(self, ctx: Context, name: str):
         """View a specific custom command's content."""
@@ -167,29 +309,70 @@ class CustomCommands(Cog):
                 ephemeral=True,
             )
 
+        # Descriptions fit the longest content; a field only holds 1024 characters
         embed = discord.Embed(
-            title=f"Command: !{command.command_name}", color=discord.Color.blurple()
+            title=f"Command: !{command.command_name}",
+            description=command.content,
+            color=discord.Color.blurple(),
         )
-        embed.add_field(name="Content", value=command.content, inline=False)
         embed.set_footer(text=f"Created by ID: {command.created_by}")
         embed.timestamp = command.created_at
 
         await ctx.respond(embed=embed, ephemeral=True)
 
+    @newcommand.command(
+        name="search", description="Search custom commands by name and content"
+    )
+    @discord.option(
+        "query",
+        str,
+        description="Words the command's name or content contains",
+        required=True,
+        max_length=100,
+    )
+    async def search_commands(self, ctx: Context, query: str):
+        """Search this guild's custom commands, best matches first."""
+        assert ctx.guild
+        results = await self.bot.search.search(ctx.guild.id, query)
+
+        if not results:
+            return await ctx.info(
+                "No Matches",
+                f"No custom commands match `{query}`.",
+                ephemeral=True,
+            )
+
+        embed = discord.Embed(
+            title=f"Custom Commands Matching \"{query}\"",
+            color=discord.Color.blurple(),
+        )
+        for result in results:
+            embed.add_field(
+                name=f"!{result.command_name}",
+                value=result.snippet or "\u200b",
+                inline=False,
+            )
+        await ctx.respond(embed=embed, ephemeral=True)
+
     @newcommand.command(name="edit", description="Edit an existing custom command")
     @discord.option(
-        "name", str, description="The name of the command to edit", required=True
+        "name",
+        str,
+        description="The name of the command to edit",
+        required=True,
+        autocomplete=command_name_autocomplete,
     )
     async def edit_command(self, ctx: Context, name: str):
         """Edit an existing custom command."""
         assert ctx.guild
 
         command_name = name.lower().strip()
-        command = await CustomCommand.get_or_none(
+        # Only the content is kept while the form is open, not the row
+        content = await CustomCommand.filter(
             discord_guild_id=ctx.guild.id, command_name=command_name
-        )
+        ).first().values_list("content", flat=True)
 
-        if not command:
+        if content is None:
             return await ctx.error(
                 "Command Not Found",
                 f"No custom command named `{command_name}` exists.",
@@ -199,37 +382,55 @@ class CustomCommands(Cog):
         # Pre-fill modal with existing data
         modal = CustomCommandModal(
             title="Edit Custom Command",
-            name_value=command.command_name,
-            content_value=command.content,
+            name_value=command_name,
+            content_value=content,
         )
-        await ctx.send_modal(modal)
-        await modal.wait()
+        with self.bot.sessions.open(
+            modal, ctx.guild.id, ctx.author.id, MODAL_TIMEOUT
+        ) as session:
+            await ctx.send_modal(modal)
+            await session.wait()
+        if not modal.submitted:
+            return
 
         # Validate new command name
         new_command_name = modal.command_name.lower().strip()
-        if not re.match(r"^[a-z0-9_]+$", new_command_name):
+        if not COMMAND_NAME.match(new_command_name):
             return await ctx.error(
                 "Invalid Command Name",
                 "Command names can only contain lowercase letters, numbers, and underscores.",
                 ephemeral=True,
             )
 
-        # Check if renaming to an existing command
-        if new_command_name != command.command_name:
-            existing = await CustomCommand.get_or_none(
-                discord_guild_id=ctx.guild.id, command_name=new_command_name
+        # Update the command, unless it was deleted while the form was open;
+        # renaming it to an existing name is rejected by the unique constraint
+        try:
+            updated = await CustomCommand.filter(
+                discord_guild_id=ctx.guild.id, command_name=command_name
+            ).update(
+                command_name=new_command_name, content=modal.content, updated_at=utcnow()
+            )
+        except IntegrityError:
+            return await ctx.error(
+                "Command Already Exists",
+                f"A command named `{new_command_name}` already exists.",
+                ephemeral=True,
+            )
+        if not updated:
+            return await ctx.error(
+                "Command Not Found",
+                f"No custom command named `{command_name}` exists.",
+                ephemeral=True,
             )
-            if existing:
-                return await ctx.error(
-                    "Command Already Exists",
-                    f"A command named `{new_command_name}` already exists.",
-                    ephemeral=True,
-                )
 
-        # Update the command
-        command.command_name = new_command_name
-        command.content = modal.content
-        await command.save()
+        old_command_name = command_name
+        if new_command_name != old_command_name:
+            self.bot.command_cache.remove(ctx.guild.id, old_command_name)
+            self.bot.search.remove(ctx.guild.id, old_command_name)
+        self.bot.command_cache.set(ctx.guild.id, new_command_name, modal.content)
+        self.bot.search.set(ctx.guild.id, new_command_name, modal.content)
+        if new_command_name != old_command_name:
+            await self.bot.usage.rename(ctx.guild.id, old_command_name, new_command_name)
 
         await ctx.success(
             "Command Updated",
@@ -239,18 +440,20 @@ class CustomCommands(Cog):
 
     @newcommand.command(name="delete", description="Delete a custom command")
     @discord.option(
-        "name", str, description="The name of the command to delete", required=True
+        "name",
+        str,
+        description="The name of the command to delete",
+        required=True,
+        autocomplete=command_name_autocomplete,
     )
     async def delete_command(self, ctx: Context, name: str):
         """Delete a custom command with confirmation."""
         assert ctx.guild
 
         command_name = name.lower().strip()
-        command = await CustomCommand.get_or_none(
+        if not await CustomCommand.exists(
             discord_guild_id=ctx.guild.id, command_name=command_name
-        )
-
-        if not command:
+        ):
             return await ctx.error(
                 "Command Not Found",
                 f"No custom command named `{command_name}` exists.",
@@ -265,11 +468,19 @@ class CustomCommands(Cog):
             color=discord.Color.orange(),
         )
 
-        await ctx.respond(embed=embed, view=view, ephemeral=True)
-        await view.wait()
+        with self.bot.sessions.open(
+            view, ctx.guild.id, ctx.author.id, CONFIRM_TIMEOUT
+        ) as session:
+            await ctx.respond(embed=embed, view=view, ephemeral=True)
+            await session.wait()
 
         if view.confirmed:
-            await command.delete()
+            await CustomCommand.filter(
+                discord_guild_id=ctx.guild.id, command_name=command_name
+            ).delete()
+            self.bot.command_cache.remove(ctx.guild.id, command_name)
+            self.bot.search.remove(ctx.guild.id, command_name)
+            await self.bot.usage.discard(ctx.guild.id, command_name)
             await ctx.edit(
                 embed=discord.Embed(
                     title="Command Deleted",
@@ -288,50 +499,272 @@ class CustomCommands(Cog):
                 view=None,
             )
 
+    @newcommand.command(name="stats", description="Show how often custom commands are used")
+    async def command_stats(self, ctx: Context):
+        """Show the most and least used custom commands."""
+        assert ctx.guild
+
+        names = await self.bot.command_cache.names(ctx.guild.id)
+        if not names:
+            return await ctx.info(
+                "No Custom Commands",
+                "No custom commands have been created yet. Use `/newcommand create` to add one.",
+                ephemeral=True,
+            )
+
+        usage = {
+            name: (uses, last_used_at)
+            for name, uses, last_used_at in await CommandUsage.filter(
+                discord_guild_id=ctx.guild.id
+            ).values_list("command_name", "uses", "last_used_at")
+        }
+        # Add the triggers that have not been written out yet, without a flush
+        for name, (uses, last_used_at) in self.bot.usage.pending(ctx.guild.id).items():
+            stored = usage.get(name)
+            usage[name] = (
+                (uses, last_used_at)
+                if stored is None
+                else (stored[0] + uses, max(stored[1], last_used_at))
+            )
+        rows = [(name, uses, last_used_at) for name, (uses, last_used_at) in usage.items()]
+        most_used = heapq.nlargest(10, rows, key=lambda row: row[1])
+        least_used = heapq.nsmallest(10, rows, key=lambda row: row[1])
+        used = set(usage)
+        never_used = sorted(names - used)
+
+        def format_usage(rows) -> str:
+            return "\n".join(
+                f"`!{name}` - {uses:,} uses, last <t:{int(last_used_at.timestamp())}:R>"
+                for name, uses, last_used_at in rows
+            )
+
+        embed = discord.Embed(
+            title=f"Custom Command Usage ({len(names)} commands)",
+            color=discord.Color.blurple(),
+        )
+        if most_used:
+            embed.add_field(name="Most Used", value=format_usage(most_used), inline=False)
+        if len(used) > len(most_used):
+            embed.add_field(
+                name="Least Used", value=format_usage(least_used), inline=False
+            )
+        if never_used:
+            value = ", ".join(f"`!{name}`" for name in never_used)
+            if len(value) > 1024:
+                value = value[:1000].rsplit(", ", 1)[0] + ", ..."
+            embed.add_field(
+                name=f"Never Used ({len(never_used)})", value=value, inline=False
+            )
+
+        await ctx.respond(embed=embed, ephemeral=True)
+
+    @newcommand.command(name="export", description="Export all custom commands as JSON")
+    async def export_commands(self, ctx: Context):
+        """Export every custom command to a JSON file."""
+        assert ctx.guild
+        await ctx.defer(ephemeral=True)
+
+        # Written page by page so only one page of rows is loaded at a time
+        buffer = io.BytesIO()
+        buffer.write(b'{"version": %d, "commands": [' % EXPORT_VERSION)
+        count = 0
+        after = None
+        while True:
+            query = CustomCommand.filter(discord_guild_id=ctx.guild.id)
+            if after is not None:
+                query = query.filter(command_name__gt=after)
+            rows = await query.order_by("command_name").limit(
+                EXPORT_PAGE_SIZE
+            ).values_list("command_name", "content")
+
+            for name, content in rows:
+                if count:
+                    buffer.write(b",")
+                buffer.write(json.dumps({"name": name, "content": content}).encode())
+                count += 1
+
+            if len(rows) < EXPORT_PAGE_SIZE:
+                break
+            after = rows[-1][0]
+        buffer.write(b"]}")
+
+        if not count:
+            return await ctx.info(
+                "No Custom Commands",
+                "No custom commands have been created yet. Use `/newcommand create` to add one.",
+                ephemeral=True,
+            )
+
+        buffer.seek(0)
+        await ctx.success(
+            "Commands Exported",
+            f"Exported {count} custom commands.",
+            file=discord.File(
+                buffer, filename=f"commands-{ctx.guild.id}-{utcnow():%Y%m%d}.json"
+            ),
+            ephemeral=True,
+        )
+
+    @newcommand.command(name="import", description="Import custom commands from a JSON export")
+    @discord.option(
+        "file", discord.Attachment, description="A file created by /newcommand export"
+    )
+    @discord.option(
+        "on_conflict",
+        str,
+        description="What to do with commands that already exist",
+        choices=["skip", "overwrite", "fail"],
+        default="skip",
+    )
+    async def import_commands(
+        self, ctx: Context, file: discord.Attachment, on_conflict: str
+    ):
+        """Import custom commands in a single transaction."""
+        assert ctx.guild
+        started = perf_counter()
+
+        if file.size > MAX_IMPORT_SIZE:
+            return await ctx.error(
+                "File Too Large",
+                f"Import files can be at most {MAX_IMPORT_SIZE // 1024 // 1024} MB.",
+                ephemeral=True,
+            )
+
+        await ctx.defer(ephemeral=True)
+        try:
+            commands_data = parse_export(await file.read())
+        except ValueError as error:
+            return await ctx.error("Invalid Import File", str(error), ephemeral=True)
+
+        async with in_transaction("default") as connection:
+            existing = set(
+                await CustomCommand.filter(discord_guild_id=ctx.guild.id)
+                .using_db(connection)
+                .values_list("command_name", flat=True)
+            )
+            conflicts = sorted(existing.intersection(commands_data))
+            if conflicts and on_conflict == "fail":
+                shown = ", ".join(f"`!{name}`" for name in conflicts[:20])
+                return await ctx.error(
+                    "Import Cancelled",
+                    f"{len(conflicts)} commands already exist: {shown}"
+                    + (", ..." if len(conflicts) > 20 else ""),
+                    ephemeral=True,
+                )
+
+            objects = [
+                CustomCommand(
+                    discord_guild_id=ctx.guild.id,
+                    command_name=name,
+                    content=content,
+                    created_by=ctx.author.id,
+                )
+                for name, content in commands_data.items()
+                if on_conflict == "overwrite" or name not in existing
+            ]
+            if on_conflict == "overwrite":
+                await CustomCommand.bulk_create(
+                    objects,
+                    batch_size=EXPORT_PAGE_SIZE,
+                    on_conflict=["discord_guild_id", "command_name"],
+                    update_fields=["content", "updated_at"],
+                    using_db=connection,
+                )
+            else:
+                await CustomCommand.bulk_create(
+                    objects,
+                    batch_size=EXPORT_PAGE_SIZE,
+                    ignore_conflicts=True,
+                    using_db=connection,
+                )
+
+        # Writes on an explicit connection skip the router, so pin reads here
+        if self.bot.replica is not None:
+            self.bot.replica.wrote(CustomCommand)
+        await self.bot.command_cache.load_guild(ctx.guild.id)
+        self.bot.search.forget(ctx.guild.id)
+
+        created = len(commands_data) - len(conflicts)
+        summary = f"Created **{created}**"
+        if conflicts:
+            action = "overwrote" if on_conflict == "overwrite" else "skipped"
+            summary += f", {action} **{len(conflicts)}** existing"
+        await ctx.success(
+            "Commands Imported",
+            f"{summary} in {(perf_counter() - started) * 1000:.0f}ms.",
+            ephemeral=True,
+        )
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        """Warm the command cache for a newly joined guild."""
+        await self.bot.command_cache.load_guild(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        """Drop a guild's commands from the cache when leaving it."""
+        self.bot.command_cache.forget(guild.id)
+        self.bot.search.forget(guild.id)
+
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
         """Listen for custom command triggers."""
-        self.logger.debug(f"on_message triggered: '{message.content}' from {message.author} in {message.guild}")
+        started = perf_counter()
 
-        # Ignore bot messages
-        if message.author.bot:
-            self.logger.debug(f"Ignoring bot message from {message.author}")
+        # Ignore bot messages and DMs
+        if message.author.bot or not message.guild:
             return
 
-        # Only process messages in guilds
-        if not message.guild:
-            self.logger.debug("Ignoring DM message")
-            return
+        metrics = self.bot.metrics
+        metrics.messages[message.guild.id] += 1
 
-        # Check if message starts with !
+        # Most messages are not triggers at all
         if not message.content.startswith("!"):
-            self.logger.debug(f"Message doesn't start with '!': '{message.content}'")
             return
 
-        self.logger.debug(f"Message starts with '!': '{message.content}'")
-
         # Extract command name (everything after ! until first space or end of string)
         parts = message.content[1:].split(maxsplit=1)
         if not parts:
-            self.logger.debug("No command name found after '!'")
             return
 
         command_name = parts[0].lower()
-        self.logger.debug(f"Extracted command name: '{command_name}'")
+        parsed = perf_counter()
+        metrics.parse.observe(parsed - started)
+
+        profiler = self.bot.profiler
+        if profiler is None:
+            return await self.trigger(message, command_name, parsed)
+        with profiler.profile("on_message"):
+            await self.trigger(message, command_name, parsed)
+
+    async def trigger(self, message: discord.Message, command_name: str, parsed: float):
+        """Reply to a custom command trigger, if the guild has that command."""
+        assert message.guild
+        metrics = self.bot.metrics
+
+        # Unknown names (e.g. other bots' commands) are rejected in memory
+        reply = await self.bot.command_cache.get(message.guild.id, command_name)
+        looked_up = perf_counter()
+        metrics.lookup.observe(looked_up - parsed)
+        if reply is None:
+            return
 
-        # Look up the command
-        self.logger.debug(f"Looking up command '{command_name}' in guild {message.guild.id}")
-        command = await CustomCommand.get_or_none(
-            discord_guild_id=message.guild.id, command_name=command_name
-        )
+        # Spamming a trigger must not burn through Discord's rate limits
+        if not await self.bot.limiter.acquire(
+            message.guild.id, message.channel.id, message.author.id, command_name
+        ):
+            return
 
-        if command:
-            self.logger.debug(f"Command '{command_name}' found! Sending reply with content: {command.content[:50]}...")
-            # Send ephemeral response with the command content
-            await message.reply(command.content, mention_author=False)
-            self.logger.debug(f"Reply sent for command '{command_name}'")
-        else:
-            self.logger.debug(f"Command '{command_name}' not found in database for guild {message.guild.id}")
+        self.logger.debug(
+            "Sending reply for command '%s' in guild %s", command_name, message.guild.id
+        )
+        # Content over Discord's limit was split into messages when cached
+        first, *rest = reply.chunks
+        await message.reply(first, mention_author=False)
+        for chunk in rest:
+            await message.channel.send(chunk)
+        metrics.reply.observe(perf_counter() - looked_up)
+        self.bot.usage.record(message.guild.id, command_name)
 
 
 def setup(bot):
@@ -1,7 +1,8 @@
 import discord
 from discord.commands import SlashCommandGroup
 
-from core import Cog, Context, GuildSettings
+from core import Cog, Context, GuildSettings, ThrottleSettings
+from core.ratelimit import Limits
 
 
 class Settings(Cog):
@@ -65,6 +66,50 @@ class Settings(Cog):
             f"**{guild_name}** - {region.upper()} - {realm}",
         )
 
+    @settings.command(name="throttle", description="Limit custom command replies")
+    @discord.option(
+        "user", int, description="Replies per minute per user (0 = no limit)", min_value=0
+    )
+    @discord.option(
+        "channel", int, description="Replies per minute per channel (0 = no limit)", min_value=0
+    )
+    @discord.option(
+        "guild", int, description="Replies per minute for the server (0 = no limit)", min_value=0
+    )
+    @discord.option(
+        "window",
+        int,
+        description="Seconds to ignore a repeated command in a channel (0 = never)",
+        min_value=0,
+    )
+    async def set_throttle(
+        self,
+        ctx: Context,
+        user: int,
+        channel: int,
+        guild: int,
+        window: int,
+    ):
+        """Set rate limits for custom command replies."""
+        assert ctx.guild
+        settings, created = await ThrottleSettings.get_or_create(
+            discord_guild_id=ctx.guild.id
+        )
+
+        settings.user_rate = user
+        settings.channel_rate = channel
+        settings.guild_rate = guild
+        settings.duplicate_window = window
+        await settings.save()
+        self.bot.limiter.configure(ctx.guild.id, Limits(user, channel, guild, window))
+
+        action = "created" if created else "updated"
+        await ctx.success(
+            f"Throttle Settings {action.title()}",
+            f"**{user}**/min per user - **{channel}**/min per channel - "
+            f"**{guild}**/min per server - repeats ignored for **{window}s**",
+        )
+
 
 def setup(bot):
     bot.add_cog(Settings(bot))
\ No newline at end of file
@@ -0,0 +1,94 @@
+import discord
+from discord.ext import commands
+
+from core import Cog, Context
+from core.render import format_seconds
+
+
+class Stats(Cog):
+    """Commands for inspecting bot performance."""
+
+    @discord.slash_command(
+        name="stats",
+        description="Show message dispatch statistics",
+        contexts={discord.InteractionContextType.guild},
+        default_member_permissions=discord.Permissions(administrator=True),
+    )
+    @commands.is_owner()
+    async def stats(self, ctx: Context):
+        """Show dispatch latency, message counts and cache statistics."""
+        assert ctx.guild
+        metrics = self.bot.metrics
+
+        embed = discord.Embed(title="Bot Statistics", color=discord.Color.blurple())
+        embed.add_field(
+            name="Gateway Latency",
+            value=format_seconds(self.bot.latency),
+            inline=True,
+        )
+        embed.add_field(
+            name="Messages",
+            value=f"{metrics.messages[ctx.guild.id]:,} here / "
+            f"{sum(metrics.messages.values()):,} total",
+            inline=True,
+        )
+
+        cache = self.bot.command_cache.stats()
+        embed.add_field(
+            name="Command Cache",
+            value=f"{cache['hits']:,} hits, {cache['misses']:,} misses, "
+            f"{cache['rejects']:,} rejected",
+            inline=False,
+        )
+        payloads = self.bot.command_cache.payloads
+        embed.add_field(
+            name="Reply Payloads",
+            value=f"{len(payloads):,} distinct, {payloads.hits:,} shared, "
+            f"{payloads.renders:,} rendered in {format_seconds(payloads.render_time)}",
+            inline=False,
+        )
+
+        for name, histogram in (
+            ("Parse", metrics.parse),
+            ("Lookup", metrics.lookup),
+            ("Reply", metrics.reply),
+        ):
+            embed.add_field(
+                name=f"{name} Latency",
+                value=f"p50 {format_seconds(histogram.quantile(0.5))} / "
+                f"p99 {format_seconds(histogram.quantile(0.99))} "
+                f"({histogram.count:,})",
+                inline=False,
+            )
+
+        watchdog = self.bot.watchdog
+        if watchdog:
+            lag = metrics.loop_lag
+            embed.add_field(
+                name="Event Loop Lag",
+                value=f"p50 {format_seconds(lag.quantile(0.5))} / "
+                f"p99 {format_seconds(lag.quantile(0.99))} / "
+                f"max {format_seconds(watchdog.max_lag)} "
+                f"({watchdog.stalls:,} stalls)",
+                inline=False,
+            )
+
+        profiler = self.bot.profiler
+        if profiler and profiler.handlers:
+            embed.add_field(
+                name="Database Time by Handler",
+                value="\n".join(
+                    f"`{name}` {format_seconds(stats.db_time / stats.calls)} avg / "
+                    f"{format_seconds(stats.max_db_time)} max, "
+                    f"{stats.queries / stats.calls:.1f} queries "
+                    f"({stats.calls:,} calls, {stats.flagged:,} flagged)"
+                    for name, stats in profiler.top()
+                ),
+                inline=False,
+            )
+
+        await ctx.respond(embed=embed, ephemeral=True)
+
+
+def setup(bot):
+    bot.add_cog(Stats(bot))
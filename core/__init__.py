@@ -1,15 +1,33 @@
 from discord.ext import commands
 
-from .bot import Banshee
+from .bot import AutoShardedBanshee, Banshee
+from .cache import CommandCache
 from .context import Context
-from .models import CustomCommand, GuildSettings
+from .models import (
+    Announcement,
+    ApiResponse,
+    CommandUsage,
+    CustomCommand,
+    GuildMember,
+    GuildSettings,
+    ThrottleSettings,
+)
+from .search import CommandSearch
 
 __all__ = (
+    "Announcement",
+    "ApiResponse",
+    "AutoShardedBanshee",
     "Banshee",
     "Cog",
+    "CommandCache",
+    "CommandSearch",
+    "CommandUsage",
     "Context",
     "CustomCommand",
+    "GuildMember",
     "GuildSettings",
+    "ThrottleSettings",
 )
 
 
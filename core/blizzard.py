@@ -0,0 +1,197 @@
+import asyncio
+import json
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from time import monotonic
+
+import aiohttp
+
+from .models import ApiResponse
+
+__all__ = ("BlizzardClient", "ResponseCache", "slug")
+
+logger = logging.getLogger(__name__)
+
+# {region} is replaced by the guild's region; override both to use a stub server
+API_URL = "https://{region}.api.blizzard.com"
+OAUTH_URL = "https://oauth.battle.net/token"
+
+# Keys per query when loading cached responses, below SQLite's parameter limit
+LOAD_BATCH_SIZE = 500
+MAX_ATTEMPTS = 3
+
+
+def slug(name: str) -> str:
+    """Blizzard's URL form of a realm, guild or character name."""
+    return re.sub(r"\s+", "-", name.strip().lower().replace("'", ""))
+
+
+class ResponseCache:
+    """Stored API responses, loaded and written in bulk around each sync.
+
+    Each entry keeps the validators of the last response, so repeated requests
+    are sent conditionally and a ``304 Not Modified`` reuses the stored body.
+    Such entries only have their fetch time updated, never their body.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[str, ApiResponse] = {}
+        self._dirty: dict[str, ApiResponse] = {}
+        self._touched: set[str] = set()
+
+    async def load(self, keys: list[str]) -> None:
+        missing = [key for key in keys if key not in self._entries]
+        for start in range(0, len(missing), LOAD_BATCH_SIZE):
+            for entry in await ApiResponse.filter(
+                key__in=missing[start : start + LOAD_BATCH_SIZE]
+            ):
+                self._entries[entry.key] = entry
+
+    def get(self, key: str) -> ApiResponse | None:
+        return self._entries.get(key)
+
+    def fresh(self, key: str, max_age: float) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and (
+            datetime.now(timezone.utc) - entry.fetched_at
+        ) < timedelta(seconds=max_age)
+
+    def put(
+        self, key: str, body: str, etag: str | None, last_modified: str | None
+    ) -> None:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = ApiResponse(key=key)
+        entry.body = body
+        entry.etag = etag
+        entry.last_modified = last_modified
+        entry.fetched_at = datetime.now(timezone.utc)
+        self._dirty[key] = entry
+        self._touched.discard(key)
+
+    def touch(self, key: str) -> None:
+        """Mark an unchanged response as fetched just now."""
+        self._entries[key].fetched_at = datetime.now(timezone.utc)
+        if key not in self._dirty:
+            self._touched.add(key)
+
+    async def flush(self, using_db=None) -> None:
+        """Write new or changed responses in one bulk upsert, and the fetch
+        time of unchanged ones with a single update per batch."""
+        entries, self._dirty = list(self._dirty.values()), {}
+        touched, self._touched = list(self._touched), set()
+        if entries:
+            await ApiResponse.bulk_create(
+                entries,
+                on_conflict=["key"],
+                update_fields=["etag", "last_modified", "body", "fetched_at"],
+                batch_size=LOAD_BATCH_SIZE,
+                using_db=using_db,
+            )
+
+        now = datetime.now(timezone.utc)
+        for start in range(0, len(touched), LOAD_BATCH_SIZE):
+            query = ApiResponse.filter(key__in=touched[start : start + LOAD_BATCH_SIZE])
+            if using_db is not None:
+                query = query.using_db(using_db)
+            await query.update(fetched_at=now)
+
+
+class BlizzardClient:
+    """Battle.net API client sharing one pooled session across every guild.
+
+    Requests to each region are limited to ``concurrency`` at a time, and are
+    sent with the validators of the cached response so unchanged resources
+    come back as an empty ``304``. The access token is fetched with the client
+    credentials flow and renewed shortly before it expires.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        client_id: str,
+        client_secret: str,
+        api_url: str = API_URL,
+        oauth_url: str = OAUTH_URL,
+        concurrency: int = 10,
+    ) -> None:
+        self.session = session
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.api_url = api_url
+        self.oauth_url = oauth_url
+        self.concurrency = concurrency
+        self.requests = 0
+        self.not_modified = 0
+        self._token: str | None = None
+        self._token_expires = 0.0
+        self._token_lock = asyncio.Lock()
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    async def token(self) -> str:
+        async with self._token_lock:
+            if self._token is None or monotonic() >= self._token_expires:
+                async with self.session.post(
+                    self.oauth_url,
+                    data={"grant_type": "client_credentials"},
+                    auth=aiohttp.BasicAuth(self.client_id, self.client_secret),
+                ) as response:
+                    response.raise_for_status()
+                    data = await response.json()
+                self._token = data["access_token"]
+                # Renew a minute early so requests never race the expiry
+                self._token_expires = monotonic() + data.get("expires_in", 86400) - 60
+            return self._token
+
+    async def get(
+        self, region: str, path: str, cache: ResponseCache
+    ) -> tuple[dict | None, bool]:
+        """Fetch ``path`` from a region's API.
+
+        Returns the JSON body, or ``None`` if the resource does not exist, and
+        whether it differs from the cached response.
+        """
+        key = f"{region}:{path}"
+        url = self.api_url.format(region=region) + path
+        semaphore = self._semaphores.get(region)
+        if semaphore is None:
+            semaphore = self._semaphores[region] = asyncio.Semaphore(self.concurrency)
+
+        cached = cache.get(key)
+        async with semaphore:
+            for attempt in range(1, MAX_ATTEMPTS + 1):
+                headers = {"Authorization": f"Bearer {await self.token()}"}
+                if cached is not None:
+                    if cached.etag:
+                        headers["If-None-Match"] = cached.etag
+                    if cached.last_modified:
+                        headers["If-Modified-Since"] = cached.last_modified
+
+                async with self.session.get(url, headers=headers) as response:
+                    self.requests += 1
+                    if response.status == 304 and cached is not None:
+                        self.not_modified += 1
+                        cache.touch(key)
+                        return json.loads(cached.body), False
+                    if response.status == 404:
+                        return None, cached is not None
+                    if response.status == 401 and attempt < MAX_ATTEMPTS:
+                        self._token = None
+                        continue
+                    if response.status == 429 and attempt < MAX_ATTEMPTS:
+                        await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+                        continue
+
+                    response.raise_for_status()
+                    body = await response.text()
+                    changed = cached is None or cached.body != body
+                    cache.put(
+                        key,
+                        body,
+                        response.headers.get("ETag"),
+                        response.headers.get("Last-Modified"),
+                    )
+                    return json.loads(body), changed
+
+        raise RuntimeError(f"Gave up on {url} after {MAX_ATTEMPTS} attempts")
@@ -1,27 +1,205 @@
+import asyncio
 import logging
-from os import environ, getenv, makedirs
+from os import environ, getenv, makedirs, stat
+from time import perf_counter
 
+import aiohttp
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from tortoise import Tortoise
 
+from .blizzard import API_URL, OAUTH_URL, BlizzardClient
+from .cache import CommandCache
 from .context import Context
+from .database import ReadReplica, build_config, ensure_schema, log_database_config
+from .loop import LoopWatchdog
+from .memory import log_memory_report, resident_memory
+from .metrics import Metrics, serve_metrics, write_metrics
+from .profiler import QueryProfiler
+from .ratelimit import ReplyLimiter
+from .roster import RosterSync
+from .scheduler import AnnouncementScheduler
+from .search import CommandSearch
+from .sessions import SessionManager
+from .sync import CommandSync
+from .usage import UsageTracker
 
 logger = logging.getLogger(__name__)
 
+# IDs and payload hashes of the registered application commands
+COMMAND_HASHES_PATH = "data/command_hashes.json"
+
 
 class Banshee(commands.Bot):
-    def __init__(self) -> None:
-        intents = discord.Intents.default()
-        intents.message_content = True
-        intents.messages = True
+    def __init__(
+        self,
+        launched_at: float | None = None,
+        lean: bool = False,
+        profile_memory: bool = False,
+        watch_loop: bool = False,
+        watch: bool = False,
+        profile_queries: bool = False,
+        **options,
+    ) -> None:
+        if lean:
+            # Prefix triggers only need guilds and message text, so skip the
+            # member, message and other per-guild caches entirely
+            intents = discord.Intents.none()
+            intents.guilds = True
+            intents.guild_messages = True
+            intents.message_content = True
+            options.setdefault("max_messages", None)
+            options.setdefault("member_cache_flags", discord.MemberCacheFlags.none())
+            options.setdefault("chunk_guilds_at_startup", False)
+        else:
+            intents = discord.Intents.default()
+            intents.message_content = True
+            intents.messages = True
+
         super().__init__(
             auto_sync_commands=False,
             help_command=None,
-            intents=intents
+            intents=intents,
+            **options,
+        )
+        self.command_cache = CommandCache(
+            max_guilds=int(getenv("COMMAND_CACHE_MAX_GUILDS", 10_000)),
+            max_bytes=int(getenv("COMMAND_CACHE_MAX_MB", 256)) * 1024 * 1024,
+            owns=self.owns_guild,
+        )
+        self.limiter = ReplyLimiter()
+        self.search = CommandSearch()
+        self.scheduler = AnnouncementScheduler(
+            self.send_announcement,
+            owns=self.owns_guild,
+            send_rate=float(getenv("ANNOUNCEMENT_SEND_RATE", 5)),
+        )
+        self.sessions = SessionManager(
+            self._connection._modal_store,
+            max_sessions=int(getenv("SESSION_MAX", 1000)),
+            max_per_guild=int(getenv("SESSION_MAX_PER_GUILD", 20)),
+            max_readonly_per_guild=int(getenv("SESSION_MAX_LISTS_PER_GUILD", 20)),
+        )
+        self.usage = UsageTracker()
+        self.metrics = Metrics()
+        self.metrics.register(
+            "banshee_gateway_latency_seconds",
+            "Discord gateway heartbeat latency",
+            lambda: self.latency,
+        )
+        for counter in ("hits", "misses", "rejects"):
+            self.metrics.register(
+                f"banshee_command_cache_{counter}_total",
+                f"Custom command cache {counter}",
+                lambda counter=counter: getattr(self.command_cache, counter),
+                kind="counter",
+            )
+        self.metrics.register(
+            "banshee_replies_throttled_total",
+            "Custom command replies dropped by rate limits",
+            lambda: self.limiter.throttled,
+            kind="counter",
+        )
+        self.metrics.register(
+            "banshee_replies_collapsed_total",
+            "Repeated custom command triggers dropped",
+            lambda: self.limiter.collapsed,
+            kind="counter",
+        )
+        payloads = self.command_cache.payloads
+        self.metrics.register(
+            "banshee_reply_payloads",
+            "Distinct rendered custom command replies in memory",
+            lambda: len(payloads),
+        )
+        self.metrics.register(
+            "banshee_reply_payload_hits_total",
+            "Custom command content found already rendered",
+            lambda: payloads.hits,
+            kind="counter",
+        )
+        self.metrics.register(
+            "banshee_reply_renders_total",
+            "Custom command content split into reply messages",
+            lambda: payloads.renders,
+            kind="counter",
+        )
+        self.metrics.register(
+            "banshee_reply_render_seconds_total",
+            "Time spent rendering custom command replies",
+            lambda: payloads.render_time,
+            kind="counter",
+        )
+        self.metrics.register(
+            "banshee_resident_memory_bytes", "Resident memory", resident_memory
+        )
+        self.metrics.register(
+            "banshee_announcements_scheduled",
+            "Announcements due within the scheduler's window",
+            lambda: len(self.scheduler),
+        )
+        self.metrics.register(
+            "banshee_announcements_sent_total",
+            "Scheduled announcements sent",
+            lambda: self.scheduler.sent,
+            kind="counter",
         )
+        self.metrics.register(
+            "banshee_sessions_open",
+            "Modals and views waiting on user input",
+            lambda: len(self.sessions),
+        )
+        self.metrics.register(
+            "banshee_session_guilds",
+            "Guilds with a modal or view waiting on user input",
+            lambda: self.sessions.guilds,
+        )
+        for counter in ("opened", "expired", "rejected"):
+            self.metrics.register(
+                f"banshee_sessions_{counter}_total",
+                f"Modal and view sessions {counter}",
+                lambda counter=counter: getattr(self.sessions, counter),
+                kind="counter",
+            )
+        self._metrics_server: asyncio.Server | None = None
+        self.profile_memory = profile_memory
+        self.watch = watch
+        self._mtimes: dict[str, float] = {}
+        self.http_session: aiohttp.ClientSession | None = None
+        self.roster: RosterSync | None = None
+        self.replica: ReadReplica | None = None
+
+        self.profiler: QueryProfiler | None = None
+        if profile_queries:
+            self.profiler = QueryProfiler(
+                max_queries=int(getenv("PROFILE_MAX_QUERIES", 3)),
+                max_db_time=float(getenv("PROFILE_MAX_DB_MS", 50)) / 1000,
+                slow_query=float(getenv("PROFILE_SLOW_QUERY_MS", 20)) / 1000,
+            )
 
-    async def setup_tortoise(self) -> None:
+        self.watchdog: LoopWatchdog | None = None
+        if watch_loop:
+            self.watchdog = LoopWatchdog(
+                self.metrics.loop_lag,
+                threshold=float(getenv("LOOP_STALL_THRESHOLD", 0.25)),
+            )
+            self.metrics.register(
+                "banshee_event_loop_stalls_total",
+                "Times the event loop was blocked past the stall threshold",
+                lambda: self.watchdog.stalls,
+                kind="counter",
+            )
+
+        # Time from process launch to the first on_ready
+        self.launched_at = launched_at or perf_counter()
+        self.cold_start: float | None = None
+        self.metrics.register(
+            "banshee_cold_start_seconds",
+            "Time from process launch to the first ready event",
+            lambda: self.cold_start or 0.0,
+        )
+
+    async def setup_tortoise(self, migrate: bool = False) -> None:
         db_url = getenv("DATABASE_URL", "sqlite://data/database.db")
 
         # Only create data directory for SQLite
@@ -29,27 +207,241 @@ class Banshee(commands.Bot):
             makedirs("data", exist_ok=True)
             logger.info("Using SQLite database (local development)")
         else:
-            logger.info(f"Using PostgreSQL database (production)")
+            logger.info("Using PostgreSQL database (production)")
+
+        read_url = getenv("DATABASE_READ_URL")
+        await Tortoise.init(config=build_config(db_url, read_url))
+        if self.profiler:
+            self.profiler.install()
+        await log_database_config()
+        await ensure_schema(force=migrate)
+        await self.search.setup()
+
+        if read_url and not migrate:
+            self.replica = ReadReplica(
+                max_lag=float(getenv("DATABASE_READ_MAX_LAG", 5)),
+                interval=float(getenv("DATABASE_READ_CHECK_INTERVAL", 5)),
+                fallback=getenv("DATABASE_READ_FALLBACK", "primary"),
+            )
+            await self.replica.setup()
+            self.metrics.register(
+                "banshee_replica_lag_seconds",
+                "Replication lag of the read replica, -1 while it is unreachable",
+                lambda: -1 if self.replica.lag is None else self.replica.lag,
+            )
+            self.metrics.register(
+                "banshee_replica_reads_total",
+                "Queries sent to the read replica",
+                lambda: self.replica.reads,
+                kind="counter",
+            )
+            self.metrics.register(
+                "banshee_replica_primary_reads_total",
+                "Replica-eligible queries sent to the primary while it lagged or after writes",
+                lambda: self.replica.primary_reads,
+                kind="counter",
+            )
+            self.check_replica.change_interval(seconds=self.replica.interval)
+            self.check_replica.start()
 
-        await Tortoise.init(
-            db_url=db_url, modules={"models": ["core.models"]}
+    async def migrate(self) -> None:
+        """Run the schema step on its own, e.g. before a deploy."""
+        await self.setup_tortoise(migrate=True)
+        await Tortoise.close_connections()
+
+    def setup_roster(self, client_id: str, client_secret: str) -> None:
+        """Sync WoW guild rosters periodically through one pooled HTTP session."""
+        self.http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=30),
+        )
+        client = BlizzardClient(
+            self.http_session,
+            client_id,
+            client_secret,
+            api_url=getenv("BLIZZARD_API_URL", API_URL),
+            oauth_url=getenv("BLIZZARD_OAUTH_URL", OAUTH_URL),
+            concurrency=int(getenv("BLIZZARD_CONCURRENCY", 10)),
+        )
+        self.roster = RosterSync(client, owns=self.owns_guild)
+        self.metrics.register(
+            "banshee_blizzard_requests_total",
+            "Requests sent to the Blizzard API",
+            lambda: client.requests,
+            kind="counter",
+        )
+        self.metrics.register(
+            "banshee_blizzard_not_modified_total",
+            "Blizzard API requests answered with 304 Not Modified",
+            lambda: client.not_modified,
+            kind="counter",
         )
-        await Tortoise.generate_schemas()
+
+        self.sync_rosters.change_interval(
+            seconds=float(getenv("ROSTER_SYNC_INTERVAL", 3600))
+        )
+        self.sync_rosters.start()
 
     async def start(self, token: str, *, reconnect: bool = True) -> None:
+        # Started first so blocking during startup is reported as well
+        if self.watchdog:
+            self.watchdog.start()
+
         await self.setup_tortoise()
+        await self.command_cache.load()
+        await self.limiter.load()
+        self.scheduler.start()
+
+        if port := getenv("METRICS_PORT"):
+            self._metrics_server = await serve_metrics(self.metrics, int(port))
+        if getenv("METRICS_FILE"):
+            self.dump_metrics.start()
+        if self.profile_memory:
+            self.report_memory.start()
+        if self.watch:
+            self.watch_extensions.start()
+        if client_id := getenv("BLIZZARD_CLIENT_ID"):
+            self.setup_roster(client_id, getenv("BLIZZARD_CLIENT_SECRET", ""))
+
+        self.flush_usage.change_interval(
+            seconds=float(getenv("USAGE_FLUSH_INTERVAL", 60))
+        )
+        self.flush_usage.start()
+
         return await super().start(token, reconnect=reconnect)
 
     async def close(self) -> None:
+        self.dump_metrics.cancel()
+        self.report_memory.cancel()
+        self.watch_extensions.cancel()
+        self.sync_rosters.cancel()
+        self.scheduler.stop()
+        self.flush_usage.cancel()
+        self.check_replica.cancel()
+        if self.watchdog:
+            self.watchdog.stop()
+        try:
+            await self.usage.flush()
+        except Exception:
+            logger.exception("Failed to flush command usage on close")
+
+        if self._metrics_server:
+            self._metrics_server.close()
+        if self.http_session:
+            await self.http_session.close()
         await Tortoise.close_connections()
         return await super().close()
 
+    @tasks.loop(seconds=15)
+    async def dump_metrics(self) -> None:
+        # Render on the loop, since handlers update the counters while it runs
+        text = self.metrics.render()
+        await asyncio.to_thread(write_metrics, text, getenv("METRICS_FILE"))
+
+    @tasks.loop(seconds=60)
+    async def flush_usage(self) -> None:
+        try:
+            await self.usage.flush()
+        except Exception:
+            logger.exception("Failed to flush command usage")
+
+    @tasks.loop(seconds=5)
+    async def check_replica(self) -> None:
+        try:
+            await self.replica.check()
+        except Exception:
+            logger.exception("Failed to check the read replica")
+
+    @tasks.loop(hours=1)
+    async def sync_rosters(self) -> None:
+        try:
+            await self.roster.sync_all()
+        except Exception:
+            logger.exception("Failed to sync guild rosters")
+
+    @tasks.loop(minutes=1)
+    async def report_memory(self) -> None:
+        await self.wait_until_ready()
+        log_memory_report(self)
+
+    @tasks.loop(seconds=1)
+    async def watch_extensions(self) -> None:
+        for name, module in list(self.extensions.items()):
+            try:
+                mtime = stat(module.__file__).st_mtime
+            except (OSError, TypeError):
+                continue
+
+            previous = self._mtimes.setdefault(name, mtime)
+            if mtime == previous:
+                continue
+
+            # Remembered even on failure, so a broken file is retried once saved again
+            self._mtimes[name] = mtime
+            try:
+                self.reload(name)
+            except Exception:
+                logger.exception("Failed to reload %s", name)
+
+    def reload(self, name: str) -> float:
+        """Reload an extension in place and return how long it took.
+
+        The gateway connection, database pools and the state held by the bot
+        (command cache, limiter, usage and metrics) are kept. Registered command
+        IDs are carried over to the new command objects, so no sync is needed
+        unless the commands themselves changed. A failed reload leaves the
+        previous version loaded.
+        """
+        ids = {
+            (command.name, command.type): command.id
+            for command in self.pending_application_commands
+            if command.id
+        }
+
+        started = perf_counter()
+        self.reload_extension(name)
+        for command in self.pending_application_commands:
+            command_id = ids.get((command.name, command.type))
+            if command.id is None and command_id:
+                command.id = command_id
+                self._application_commands[command_id] = command
+        elapsed = perf_counter() - started
+
+        logger.info("Reloaded %s in %.1fms", name, elapsed * 1000)
+        return elapsed
+
+    def owns_guild(self, guild_id: int) -> bool:
+        """Whether the guild is on one of this process's shards."""
+        shard_ids = getattr(self, "shard_ids", None)
+        if shard_ids is None or not self.shard_count:
+            return True
+        return (guild_id >> 22) % self.shard_count in shard_ids
+
+    async def send_announcement(self, channel_id: int, content: str) -> bool:
+        await self.wait_until_ready()
+        channel = self.get_partial_messageable(channel_id)
+        try:
+            await channel.send(content)
+        except (discord.NotFound, discord.Forbidden):
+            return False
+        return True
+
+    async def invoke_application_command(self, ctx: discord.ApplicationContext) -> None:
+        if self.profiler is None:
+            return await super().invoke_application_command(ctx)
+        with self.profiler.profile(f"/{ctx.command.qualified_name}"):
+            await super().invoke_application_command(ctx)
+
     async def get_application_context(
         self, interaction: discord.Interaction, cls: type[Context] = Context
     ) -> Context:
         return cls(self, interaction)
 
     async def on_ready(self) -> None:
+        if self.cold_start is None:
+            self.cold_start = perf_counter() - self.launched_at
+            logger.info("Cold start took %.2fs", self.cold_start)
+
         print(f"{self.user} is ready")
 
     async def on_application_command_error(self, context: discord.ApplicationContext, exception: Exception):
@@ -64,6 +456,37 @@ class Banshee(commands.Bot):
             )
         )
 
+    async def sync_application_commands(self, delete_existing: bool = True) -> None:
+        """Register only the commands that changed since the last sync.
+
+        Guild-specific commands, if any, are left to Pycord's own sync.
+        """
+        commands = [
+            command
+            for command in self.pending_application_commands
+            if command.guild_ids is None
+        ]
+        syncer = CommandSync(self.http, self.application_id, COMMAND_HASHES_PATH)
+        await syncer.sync(commands, delete_existing=delete_existing)
+        for command in commands:
+            self._application_commands[command.id] = command
+
+        guild_ids = {
+            guild_id
+            for command in self.pending_application_commands
+            for guild_id in command.guild_ids or ()
+        }
+        for guild_id in guild_ids:
+            await self.register_commands(
+                [
+                    command
+                    for command in self.pending_application_commands
+                    if command.guild_ids and guild_id in command.guild_ids
+                ],
+                guild_id=guild_id,
+                delete_existing=delete_existing,
+            )
+
     def run(
         self, debug: bool = False, cogs: list[str] | None = None, sync: bool = False
     ) -> None:
@@ -71,7 +494,7 @@ class Banshee(commands.Bot):
 
         if sync:
             async def on_connect() -> None:
-                await self.sync_commands(delete_existing=not debug)
+                await self.sync_application_commands(delete_existing=not debug)
                 print("Synchronized commands.")
 
             self.on_connect = on_connect
@@ -81,4 +504,8 @@ class Banshee(commands.Bot):
         if not token:
             raise ValueError("DISCORD_TOKEN environment variable is required")
 
-        super().run(token)
\ No newline at end of file
+        super().run(token)
+
+
+class AutoShardedBanshee(Banshee, commands.AutoShardedBot):
+    """Banshee running several gateway shards in one process."""
@@ -0,0 +1,306 @@
+import logging
+import sys
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from collections.abc import Callable
+from time import monotonic
+
+from tortoise.expressions import Q
+
+from .models import CustomCommand
+from .render import PayloadCache, Reply
+
+__all__ = ("CommandCache",)
+
+logger = logging.getLogger(__name__)
+
+# Rows read per query by load, which bounds the rows held at once
+LOAD_PAGE_SIZE = 5000
+
+
+class CommandCache:
+    """In-memory cache of custom command replies, keyed by guild.
+
+    Each guild maps command names to their rendered :class:`Reply` rather than
+    model instances. Replies come from :attr:`payloads`, so content is split
+    into messages once when it is loaded or saved, and guilds with the same
+    content share one reply.
+    Guilds are kept in least-recently-used order and the oldest are evicted once
+    ``max_guilds`` or ``max_bytes`` is exceeded; they are reloaded on next use.
+
+    The set of command names per guild is kept separately and is never evicted,
+    so triggers for unknown commands are rejected without touching the database.
+    Once :meth:`load` has run, a guild without a name set has no commands. Before
+    that, misses are remembered for ``negative_ttl`` seconds. A sorted copy of the
+    names is built on first use for prefix completion and then kept up to date.
+
+    ``owns`` selects the guilds this process is responsible for, e.g. those on
+    its shards; :meth:`load` skips every other guild.
+    """
+
+    def __init__(
+        self,
+        max_guilds: int = 10_000,
+        max_bytes: int = 256 * 1024 * 1024,
+        negative_ttl: float = 60.0,
+        max_negative: int = 10_000,
+        owns: Callable[[int], bool] = lambda guild_id: True,
+    ) -> None:
+        self.owns = owns
+        self.max_guilds = max_guilds
+        self.max_bytes = max_bytes
+        self.negative_ttl = negative_ttl
+        self.max_negative = max_negative
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.rejects = 0
+        self._complete = False
+        self.payloads = PayloadCache()
+        self._guilds: OrderedDict[int, dict[str, Reply]] = OrderedDict()
+        self._sizes: dict[int, int] = {}
+        self._names: dict[int, set[str]] = {}
+        self._sorted: dict[int, list[str]] = {}
+        self._negative: dict[tuple[int, str], float] = {}
+
+    def __len__(self) -> int:
+        return len(self._guilds)
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self._guilds
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "rejects": self.rejects,
+            "guilds": len(self._guilds),
+            "bytes": self.size,
+            "payloads": len(self.payloads),
+            "payload_hits": self.payloads.hits,
+            "renders": self.payloads.renders,
+        }
+
+    async def load(self) -> None:
+        """Bulk load the commands of every owned guild, a page of rows at a time.
+
+        Each guild is stored as soon as its rows are read, so eviction keeps
+        memory within ``max_guilds`` and ``max_bytes`` while loading too.
+        """
+        self.clear()
+        render = self.payloads.render
+        owns = self.owns
+        count = 0
+        current: int | None = None
+        commands: dict[str, Reply] = {}
+        after: tuple[int, str] | None = None
+        while True:
+            query = CustomCommand.all()
+            if after is not None:
+                # Keyset pagination on the (guild, name) unique index
+                query = query.filter(
+                    Q(discord_guild_id__gt=after[0])
+                    | Q(discord_guild_id=after[0], command_name__gt=after[1])
+                )
+            rows = await query.order_by("discord_guild_id", "command_name").limit(
+                LOAD_PAGE_SIZE
+            ).values_list("discord_guild_id", "command_name", "content")
+
+            for guild_id, command_name, content in rows:
+                if guild_id != current:
+                    if commands:
+                        self._load_commands(current, commands)
+                    current, commands = guild_id, {}
+                if owns(guild_id):
+                    commands[sys.intern(command_name)] = render(content)
+                    count += 1
+
+            if len(rows) < LOAD_PAGE_SIZE:
+                break
+            after = rows[-1][0], rows[-1][1]
+
+        if commands:
+            self._load_commands(current, commands)
+        self._complete = True
+
+        logger.info(
+            "Cached %d custom commands for %d guilds (%d KiB)",
+            count,
+            len(self._guilds),
+            self.size // 1024,
+        )
+
+    def _load_commands(self, guild_id: int, commands: dict[str, Reply]) -> None:
+        self._names[guild_id] = set(commands)
+        self._store(guild_id, commands)
+
+    async def load_guild(self, guild_id: int) -> dict[str, Reply]:
+        """(Re)load a single guild's commands from the database."""
+        rows = await CustomCommand.filter(discord_guild_id=guild_id).values_list(
+            "command_name", "content"
+        )
+        render = self.payloads.render
+        commands = {sys.intern(name): render(content) for name, content in rows}
+        self._names[guild_id] = set(commands)
+        self._sorted.pop(guild_id, None)
+        self._store(guild_id, commands)
+        return commands
+
+    async def get(self, guild_id: int, command_name: str) -> Reply | None:
+        """Return a command's reply, or ``None`` if the guild has no such command.
+
+        Unknown names are rejected from the in-memory name set without any I/O.
+        Content evicted from the cache is reloaded for the guild on demand.
+        """
+        names = self._names.get(guild_id)
+        if names is None:
+            if self._complete:
+                self.rejects += 1
+                return None
+            return await self._lookup(guild_id, command_name)
+
+        if command_name not in names:
+            self.rejects += 1
+            return None
+
+        commands = self._guilds.get(guild_id)
+        if commands is None:
+            commands = await self.load_guild(guild_id)
+        else:
+            self._guilds.move_to_end(guild_id)
+
+        self.hits += 1
+        return commands.get(command_name)
+
+    async def names(self, guild_id: int) -> set[str]:
+        """Return the names of a guild's commands."""
+        names = self._names.get(guild_id)
+        if names is None:
+            if self._complete:
+                return set()
+            await self.load_guild(guild_id)
+            names = self._names[guild_id]
+        return names
+
+    async def complete(self, guild_id: int, prefix: str, limit: int = 25) -> list[str]:
+        """Return up to ``limit`` command names starting with ``prefix``.
+
+        Falls back to names containing ``prefix`` when none start with it.
+        """
+        index = self._sorted.get(guild_id)
+        if index is None:
+            index = self._sorted[guild_id] = sorted(await self.names(guild_id))
+
+        matches = []
+        for name in index[bisect_left(index, prefix) :]:
+            if not name.startswith(prefix) or len(matches) == limit:
+                break
+            matches.append(name)
+
+        if not matches and prefix:
+            matches = [name for name in index if prefix in name][:limit]
+        return matches
+
+    def set(self, guild_id: int, command_name: str, content: str) -> None:
+        """Render a created or edited command and write it through to the cache."""
+        command_name = sys.intern(command_name)
+        self._negative.pop((guild_id, command_name), None)
+
+        names = self._names.get(guild_id)
+        if names is not None:
+            index = self._sorted.get(guild_id)
+            if index is not None and command_name not in names:
+                insort(index, command_name)
+            names.add(command_name)
+        elif self._complete:
+            self._names[guild_id] = {command_name}
+
+        commands = self._guilds.get(guild_id)
+        if commands is None:
+            # Content is not cached; the guild picks it up when next loaded
+            return
+
+        commands[command_name] = self.payloads.render(content)
+        self._guilds.move_to_end(guild_id)
+        self._resize(guild_id, commands)
+
+    def remove(self, guild_id: int, command_name: str) -> None:
+        """Drop a deleted or renamed command from the cache."""
+        names = self._names.get(guild_id)
+        if names is not None and command_name in names:
+            names.discard(command_name)
+            index = self._sorted.get(guild_id)
+            if index is not None:
+                del index[bisect_left(index, command_name)]
+
+        commands = self._guilds.get(guild_id)
+        if commands is None or commands.pop(command_name, None) is None:
+            return
+
+        self._resize(guild_id, commands)
+
+    def evict(self, guild_id: int) -> None:
+        """Drop a guild's command content, keeping its known names."""
+        if self._guilds.pop(guild_id, None) is not None:
+            self.size -= self._sizes.pop(guild_id)
+
+    def forget(self, guild_id: int) -> None:
+        """Drop everything cached for a guild, e.g. after leaving it."""
+        self.evict(guild_id)
+        self._names.pop(guild_id, None)
+        self._sorted.pop(guild_id, None)
+
+    def clear(self) -> None:
+        self._guilds.clear()
+        self._sizes.clear()
+        self._names.clear()
+        self._sorted.clear()
+        self._negative.clear()
+        self._complete = False
+        self.size = 0
+
+    async def _lookup(self, guild_id: int, command_name: str) -> Reply | None:
+        # The guild's names are unknown, so check the single command before
+        # pulling in the whole guild and remember misses for a while.
+        key = (guild_id, command_name)
+        now = monotonic()
+        expires = self._negative.get(key)
+        if expires is not None:
+            if expires > now:
+                self.rejects += 1
+                return None
+            del self._negative[key]
+
+        exists = await CustomCommand.filter(
+            discord_guild_id=guild_id, command_name=command_name
+        ).exists()
+        if not exists:
+            self.misses += 1
+            if len(self._negative) >= self.max_negative:
+                del self._negative[next(iter(self._negative))]
+            self._negative[key] = now + self.negative_ttl
+            return None
+
+        commands = await self.load_guild(guild_id)
+        self.hits += 1
+        return commands.get(command_name)
+
+    def _store(self, guild_id: int, commands: dict[str, Reply]) -> None:
+        self.evict(guild_id)
+        self._guilds[guild_id] = commands
+        self._resize(guild_id, commands)
+
+    def _resize(self, guild_id: int, commands: dict[str, Reply]) -> None:
+        # Shared replies are counted for every guild using them, an upper bound
+        size = sys.getsizeof(commands) + sum(
+            sys.getsizeof(name) + reply.size for name, reply in commands.items()
+        )
+        self.size += size - self._sizes.get(guild_id, 0)
+        self._sizes[guild_id] = size
+
+        # Evict the least recently used guilds, always keeping the newest one
+        while len(self._guilds) > 1 and (
+            len(self._guilds) > self.max_guilds or self.size > self.max_bytes
+        ):
+            oldest = next(iter(self._guilds))
+            self.evict(oldest)
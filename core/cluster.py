@@ -0,0 +1,246 @@
+import logging
+import logging.handlers
+import multiprocessing
+import random
+import signal
+import time
+from math import ceil
+from multiprocessing.process import BaseProcess
+from os import environ
+
+__all__ = ("ClusterLauncher", "run_cluster", "run_fake_cluster", "shard_ranges")
+
+logger = logging.getLogger(__name__)
+
+# Restarts back off exponentially up to this many seconds
+MAX_BACKOFF = 60.0
+# A worker that stayed up this long has its backoff reset
+STABLE_AFTER = 300.0
+
+
+def shard_ranges(shard_count: int, cluster_count: int) -> list[list[int]]:
+    """Spread shard IDs over clusters as evenly as possible, in contiguous ranges."""
+    size, extra = divmod(shard_count, cluster_count)
+    ranges = []
+    start = 0
+    for index in range(cluster_count):
+        end = start + size + (index < extra)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+class ClusterLogHandler(logging.handlers.QueueHandler):
+    """Forwards a worker's log records to the launcher, tagged with the cluster."""
+
+    def __init__(self, queue, index: int) -> None:
+        super().__init__(queue)
+        self.index = index
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = super().prepare(record)
+        record.msg = f"[cluster {self.index}] {record.msg}"
+        return record
+
+
+class ParentLogHandler(logging.Handler):
+    """Re-emits forwarded records through the launcher's own loggers."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        logging.getLogger(record.name).handle(record)
+
+
+def configure_worker_logging(queue, index: int, debug: bool) -> None:
+    handler = ClusterLogHandler(queue, index)
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    for name in ("discord", "cogs", "core"):
+        logging.getLogger(name).setLevel(logging.DEBUG if debug else logging.INFO)
+
+
+def run_cluster(
+    index: int,
+    shard_ids: list[int],
+    shard_count: int,
+    cluster_count: int,
+    log_queue,
+    options: dict,
+) -> None:
+    """Worker entry point: run the shards in ``shard_ids`` in this process."""
+    from .bot import AutoShardedBanshee
+    from .loop import use_uvloop
+
+    configure_worker_logging(log_queue, index, options["debug"])
+    if options["uvloop"]:
+        use_uvloop()
+
+    # DATABASE_POOL_MAX is the budget for the whole cluster
+    pool_max = max(1, ceil(int(environ.get("DATABASE_POOL_MAX", 10)) / cluster_count))
+    pool_min = min(int(environ.get("DATABASE_POOL_MIN", 1)), pool_max)
+    environ["DATABASE_POOL_MAX"] = str(pool_max)
+    environ["DATABASE_POOL_MIN"] = str(pool_min)
+
+    bot = AutoShardedBanshee(
+        lean=options["lean"],
+        profile_memory=options["profile_memory"],
+        watch_loop=options["watch_loop"],
+        profile_queries=options["profile_queries"],
+        shard_ids=shard_ids,
+        shard_count=shard_count,
+    )
+    bot.run(
+        debug=options["debug"],
+        cogs=options["cogs"],
+        # Commands are global, so only one cluster needs to sync them
+        sync=options["sync"] and index == 0,
+    )
+
+
+def run_fake_cluster(
+    index: int,
+    shard_ids: list[int],
+    shard_count: int,
+    cluster_count: int,
+    log_queue,
+    options: dict,
+) -> None:
+    """Worker that pretends to connect its shards, for testing the launcher locally.
+
+    Shards "heartbeat" every few seconds and the worker crashes at a random
+    point to exercise supervision and restarts.
+    """
+    configure_worker_logging(log_queue, index, options["debug"])
+    log = logging.getLogger("core.cluster")
+
+    for shard_id in shard_ids:
+        log.info("Shard %d/%d connected to fake gateway", shard_id, shard_count)
+
+    crash_at = time.monotonic() + random.uniform(10, 60)
+    try:
+        while time.monotonic() < crash_at:
+            time.sleep(5)
+            log.debug("Heartbeat for shards %s", shard_ids)
+    except KeyboardInterrupt:
+        return
+
+    log.error("Fake gateway closed the connection")
+    raise SystemExit(1)
+
+
+class Cluster:
+    def __init__(self, index: int, shard_ids: list[int]) -> None:
+        self.index = index
+        self.shard_ids = shard_ids
+        self.process: BaseProcess | None = None
+        self.started_at = 0.0
+        self.restart_at = 0.0
+        self.backoff = 1.0
+        self.restarts = 0
+
+
+class ClusterLauncher:
+    """Runs shards across worker processes and restarts workers that exit.
+
+    Each worker logs through a shared queue, so the launcher writes all output
+    with its own handlers. ``target`` is the worker entry point, which can be
+    swapped for :func:`run_fake_cluster` to test without Discord.
+    """
+
+    def __init__(
+        self,
+        shard_count: int,
+        cluster_count: int,
+        options: dict,
+        target=run_cluster,
+    ) -> None:
+        if not 0 < cluster_count <= shard_count:
+            raise ValueError("Cluster count must be between 1 and the shard count")
+
+        self.shard_count = shard_count
+        self.cluster_count = cluster_count
+        self.options = options
+        self.target = target
+        self.clusters = [
+            Cluster(index, shard_ids)
+            for index, shard_ids in enumerate(shard_ranges(shard_count, cluster_count))
+        ]
+        self._context = multiprocessing.get_context("spawn")
+        self._log_queue = self._context.Queue()
+        self._stopping = False
+
+    def start(self, cluster: Cluster) -> None:
+        cluster.process = self._context.Process(
+            target=self.target,
+            args=(
+                cluster.index,
+                cluster.shard_ids,
+                self.shard_count,
+                self.cluster_count,
+                self._log_queue,
+                self.options,
+            ),
+            name=f"banshee-cluster-{cluster.index}",
+            daemon=True,
+        )
+        cluster.process.start()
+        cluster.started_at = time.monotonic()
+        logger.info(
+            "Started cluster %d (pid %s) with shards %d-%d",
+            cluster.index,
+            cluster.process.pid,
+            cluster.shard_ids[0],
+            cluster.shard_ids[-1],
+        )
+
+    def supervise(self) -> None:
+        now = time.monotonic()
+        for cluster in self.clusters:
+            process = cluster.process
+            if process is not None and process.is_alive():
+                continue
+
+            if process is not None:
+                # Schedule a restart, backing off if the worker keeps dying
+                if now - cluster.started_at >= STABLE_AFTER:
+                    cluster.backoff = 1.0
+                logger.warning(
+                    "Cluster %d exited with code %s, restarting in %.0fs",
+                    cluster.index,
+                    process.exitcode,
+                    cluster.backoff,
+                )
+                cluster.process = None
+                cluster.restart_at = now + cluster.backoff
+                cluster.backoff = min(cluster.backoff * 2, MAX_BACKOFF)
+                cluster.restarts += 1
+            elif now >= cluster.restart_at:
+                self.start(cluster)
+
+    def stop(self, *_) -> None:
+        self._stopping = True
+
+    def run(self) -> None:
+        listener = logging.handlers.QueueListener(self._log_queue, ParentLogHandler())
+        listener.start()
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        logger.info(
+            "Launching %d shards across %d clusters",
+            self.shard_count,
+            self.cluster_count,
+        )
+        try:
+            while not self._stopping:
+                self.supervise()
+                time.sleep(1)
+        finally:
+            for cluster in self.clusters:
+                if cluster.process is not None and cluster.process.is_alive():
+                    cluster.process.terminate()
+            for cluster in self.clusters:
+                if cluster.process is not None:
+                    cluster.process.join(timeout=10)
+            listener.stop()
+            logger.info("All clusters stopped")
@@ -0,0 +1,310 @@
+import json
+import logging
+from hashlib import sha256
+from os import getenv
+from time import monotonic, perf_counter, time
+
+from tortoise import Tortoise, connections
+from tortoise.backends.base.client import TransactionalDBClient
+from tortoise.backends.base.config_generator import expand_db_url, generate_config
+from tortoise.exceptions import OperationalError
+from tortoise.transactions import in_transaction
+
+from .models import CustomCommand, GuildSettings
+
+__all__ = (
+    "ReadReplica",
+    "ReadRouter",
+    "build_config",
+    "ensure_schema",
+    "log_database_config",
+)
+
+logger = logging.getLogger(__name__)
+
+SQLITE_PRAGMAS = ("journal_mode", "synchronous", "mmap_size", "cache_size", "busy_timeout")
+
+SCHEMA_TABLE = "schema_version"
+HEARTBEAT_TABLE = "replica_heartbeat"
+
+# Models whose reads may be served by the replica; everything else stays on the primary
+READ_MODELS = (CustomCommand, GuildSettings)
+
+
+def build_config(db_url: str, read_url: str | None = None) -> dict:
+    """Build the Tortoise config for ``db_url`` with pool and pragma tuning.
+
+    Settings given as query parameters on the URL take precedence over the
+    environment variables. With ``read_url``, a ``replica`` connection is added
+    and :class:`ReadRouter` decides which reads use it.
+    """
+    config = generate_config(db_url, app_modules={"models": ["core.models"]})
+    tune_credentials(db_url, config["connections"]["default"]["credentials"])
+
+    if read_url:
+        replica = expand_db_url(read_url)
+        tune_credentials(read_url, replica["credentials"])
+        config["connections"]["replica"] = replica
+        config["routers"] = [ReadRouter]
+
+    return config
+
+
+def tune_credentials(db_url: str, credentials: dict) -> None:
+    if db_url.startswith("sqlite"):
+        # Every extra credential is applied as a PRAGMA on connect
+        credentials.setdefault("journal_mode", "WAL")
+        credentials.setdefault("synchronous", getenv("SQLITE_SYNCHRONOUS", "NORMAL"))
+        credentials.setdefault(
+            "mmap_size", int(getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+        )
+        # Negative values are in KiB rather than pages
+        credentials.setdefault("cache_size", int(getenv("SQLITE_CACHE_SIZE", -64_000)))
+        credentials.setdefault("busy_timeout", 5000)
+    else:
+        credentials.setdefault("minsize", int(getenv("DATABASE_POOL_MIN", 1)))
+        credentials.setdefault("maxsize", int(getenv("DATABASE_POOL_MAX", 10)))
+        credentials.setdefault(
+            "statement_cache_size", int(getenv("DATABASE_STATEMENT_CACHE_SIZE", 100))
+        )
+        credentials.setdefault(
+            "max_inactive_connection_lifetime",
+            float(getenv("DATABASE_POOL_MAX_IDLE", 300)),
+        )
+
+
+async def log_database_config() -> None:
+    """Log the pool or pragma configuration the connection actually runs with."""
+    connection = connections.get("default")
+
+    if connection.capabilities.dialect == "sqlite":
+        pragmas = {}
+        for pragma in SQLITE_PRAGMAS:
+            _, rows = await connection.execute_query(f"PRAGMA {pragma}")
+            pragmas[pragma] = rows[0][0] if rows else None
+        logger.info(
+            "SQLite pragmas: %s", " ".join(f"{k}={v}" for k, v in pragmas.items())
+        )
+    else:
+        logger.info(
+            "PostgreSQL pool: min=%s max=%s statement_cache_size=%s max_idle=%ss",
+            connection.pool_minsize,
+            connection.pool_maxsize,
+            connection.extra.get("statement_cache_size"),
+            connection.extra.get("max_inactive_connection_lifetime"),
+        )
+
+
+# Field attributes that end up in the table definition
+COLUMN_KEYS = ("db_column", "db_field_types", "generated", "nullable", "unique", "indexed")
+FOREIGN_KEY_KEYS = ("raw_field", "python_type", "on_delete", "db_constraint")
+
+
+def table_definition(model) -> dict:
+    """The parts of a model's description that shape its own table.
+
+    Docstrings, descriptions and reverse relations are left out, so adding a
+    foreign key to another model doesn't change this model's fingerprint.
+    """
+    description = model.describe()
+    return {
+        "columns": [
+            {key: field.get(key) for key in COLUMN_KEYS}
+            for field in (description["pk_field"], *description["data_fields"])
+        ],
+        "foreign_keys": [
+            {key: field.get(key) for key in FOREIGN_KEY_KEYS}
+            for field in (*description["fk_fields"], *description["o2o_fields"])
+        ],
+        "unique_together": description["unique_together"],
+        "indexes": description["indexes"],
+    }
+
+
+def schema_fingerprints() -> dict[str, str]:
+    """Hash each model's table definition, keyed by its table name."""
+    return {
+        model._meta.db_table: sha256(
+            json.dumps(table_definition(model), sort_keys=True, default=str).encode()
+        ).hexdigest()
+        for model in Tortoise.apps["models"].values()
+    }
+
+
+async def ensure_schema(force: bool = False) -> bool:
+    """Create or migrate tables only if the models changed since the last run.
+
+    The fingerprint of every model is stored in the ``schema_version`` table, so
+    an unchanged schema costs a single query at startup. Existing tables are
+    never altered, so a changed one keeps its old fingerprint and is warned
+    about on every start until its row is deleted. Returns whether the schema
+    step ran.
+    """
+    started = perf_counter()
+    connection = connections.get("default")
+    fingerprints = schema_fingerprints()
+
+    try:
+        _, rows = await connection.execute_query(
+            f"SELECT table_name, fingerprint FROM {SCHEMA_TABLE}"
+        )
+        stored = {table: fingerprint for table, fingerprint in rows}
+    except OperationalError:
+        stored = {}
+
+    if stored == fingerprints and not force:
+        logger.info(
+            "Schema is up to date (checked in %.1fms)",
+            (perf_counter() - started) * 1000,
+        )
+        return False
+
+    # Only missing tables and indexes are created; existing tables are left as is
+    await Tortoise.generate_schemas(safe=True)
+
+    current = {}
+    for table, fingerprint in fingerprints.items():
+        if table in stored and stored[table] != fingerprint:
+            logger.warning(
+                "Model for table %s changed since the last migration; alter it "
+                "manually, then delete its row from %s",
+                table,
+                SCHEMA_TABLE,
+            )
+            current[table] = stored[table]
+        else:
+            current[table] = fingerprint
+
+    await connection.execute_script(
+        f"CREATE TABLE IF NOT EXISTS {SCHEMA_TABLE} ("
+        "table_name VARCHAR(255) NOT NULL PRIMARY KEY, "
+        "fingerprint VARCHAR(64) NOT NULL)"
+    )
+    placeholders = (
+        ("?", "?") if connection.capabilities.dialect == "sqlite" else ("$1", "$2")
+    )
+    async with in_transaction("default") as transaction:
+        await transaction.execute_query(f"DELETE FROM {SCHEMA_TABLE}")
+        await transaction.execute_many(
+            f"INSERT INTO {SCHEMA_TABLE} (table_name, fingerprint) "
+            f"VALUES ({', '.join(placeholders)})",
+            list(current.items()),
+        )
+
+    logger.info(
+        "Migrated schema for %d tables in %.1fms",
+        len(fingerprints),
+        (perf_counter() - started) * 1000,
+    )
+    return True
+
+
+class ReadReplica:
+    """Tracks whether the read replica is reachable and how far behind it is.
+
+    Each :meth:`check` writes the current time to a heartbeat row on the
+    primary and reads the replica's copy back, so the difference is the
+    replication lag. This works the same for a streaming PostgreSQL replica
+    and a copied SQLite file. While the replica is down or more than
+    ``max_lag`` seconds behind, reads go to the primary, or keep going to the
+    replica if ``fallback`` is ``"replica"``.
+
+    Reads of a model also go to the primary for ``max_lag + interval`` seconds
+    after it was written, the longest a healthy replica can take to catch up,
+    so a command is never missing right after it was created or edited.
+    """
+
+    def __init__(
+        self, max_lag: float = 5.0, interval: float = 5.0, fallback: str = "primary"
+    ) -> None:
+        if fallback not in ("primary", "replica"):
+            raise ValueError("The replica fallback must be 'primary' or 'replica'")
+        self.max_lag = max_lag
+        self.interval = interval
+        self.fallback = fallback
+        self.healthy = False
+        self.lag: float | None = None
+        # Reads sent to the replica, and to the primary because of lag or pinning
+        self.reads = 0
+        self.primary_reads = 0
+        self._written: dict[type, float] = {}
+
+    def route(self, model: type) -> str:
+        if model not in READ_MODELS:
+            return "default"
+        # Reads inside a transaction must see its own writes
+        if isinstance(connections.get("default"), TransactionalDBClient):
+            return "default"
+
+        written = self._written.get(model)
+        if (
+            written is not None and monotonic() - written < self.max_lag + self.interval
+        ) or not (self.healthy or self.fallback == "replica"):
+            self.primary_reads += 1
+            return "default"
+
+        self.reads += 1
+        return "replica"
+
+    def wrote(self, model: type) -> None:
+        if model in READ_MODELS:
+            self._written[model] = monotonic()
+
+    async def setup(self) -> None:
+        await connections.get("default").execute_script(
+            f"CREATE TABLE IF NOT EXISTS {HEARTBEAT_TABLE} ("
+            "id INT NOT NULL PRIMARY KEY, beat_at DOUBLE PRECISION NOT NULL)"
+        )
+        ReadRouter.replica = self
+        await self.check()
+
+    async def check(self) -> None:
+        primary = connections.get("default")
+        placeholder = "?" if primary.capabilities.dialect == "sqlite" else "$1"
+        now = time()
+        await primary.execute_query(
+            f"INSERT INTO {HEARTBEAT_TABLE} (id, beat_at) VALUES (1, {placeholder}) "
+            "ON CONFLICT (id) DO UPDATE SET beat_at = excluded.beat_at",
+            [now],
+        )
+
+        was_healthy = self.healthy
+        try:
+            _, rows = await connections.get("replica").execute_query(
+                f"SELECT beat_at FROM {HEARTBEAT_TABLE} WHERE id = 1"
+            )
+        except Exception as error:
+            self.healthy, self.lag = False, None
+            if was_healthy:
+                logger.warning("Read replica is unavailable: %s", error)
+            return
+
+        # The row only reaches the replica once replication caught up with it
+        self.lag = max(0.0, now - rows[0][0]) if rows else None
+        self.healthy = self.lag is not None and self.lag <= self.max_lag
+        if self.healthy and not was_healthy:
+            logger.info("Reading from replica (lag %.1fs)", self.lag)
+        elif was_healthy and not self.healthy:
+            logger.warning(
+                "Read replica is %s behind, reading from the %s",
+                f"{self.lag:.1f}s" if self.lag is not None else "too far",
+                self.fallback,
+            )
+
+
+class ReadRouter:
+    """Tortoise router that sends reads to :attr:`replica` when it is usable.
+
+    Tortoise creates router instances itself, so the replica state is shared
+    through a class attribute set by :meth:`ReadReplica.setup`.
+    """
+
+    replica: ReadReplica | None = None
+
+    def db_for_read(self, model: type) -> str:
+        return self.replica.route(model) if self.replica else "default"
+
+    def db_for_write(self, model: type) -> str:
+        if self.replica:
+            self.replica.wrote(model)
+        return "default"
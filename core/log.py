@@ -0,0 +1,119 @@
+import logging
+import logging.handlers
+import queue
+from time import monotonic
+
+__all__ = (
+    "LoggerFilter",
+    "RateLimitFilter",
+    "RateLimitedLogger",
+    "start_queue_logging",
+)
+
+
+class LoggerFilter(logging.Filter):
+    """Passes records from any of the given loggers or their children."""
+
+    def __init__(self, *names: str) -> None:
+        super().__init__()
+        self.names = names
+        self.prefixes = tuple(f"{name}." for name in names)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.name in self.names or record.name.startswith(self.prefixes)
+
+
+class RateLimitFilter(logging.Filter):
+    """Drops DEBUG records beyond ``rate`` per second for each message template.
+
+    Per-message debug logs can then stay enabled under load without flooding
+    the queue. Records at INFO and above always pass.
+    """
+
+    def __init__(self, rate: float, burst: int | None = None) -> None:
+        super().__init__()
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.dropped = 0
+        self._buckets: dict[str, list[float]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or self.allow(record.msg)
+
+    def allow(self, msg: str) -> bool:
+        if not self.rate:
+            return True
+
+        now = monotonic()
+        bucket = self._buckets.get(msg)
+        if bucket is None:
+            bucket = self._buckets[msg] = [float(self.burst), now]
+
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            self.dropped += 1
+            return False
+
+        bucket[0] = tokens - 1
+        return True
+
+
+class RateLimitedLogger(logging.LoggerAdapter):
+    """Applies a :class:`RateLimitFilter` to DEBUG calls before a record is built.
+
+    Creating a record costs far more than the call itself, so per-message debug
+    logs in hot paths drop excess calls here rather than in a handler filter.
+    """
+
+    def __init__(self, logger: logging.Logger, rate: float) -> None:
+        super().__init__(logger, None)
+        self.limit = RateLimitFilter(rate)
+
+    def debug(self, msg, *args, **kwargs) -> None:
+        if self.logger.isEnabledFor(logging.DEBUG) and self.limit.allow(msg):
+            self.logger.debug(msg, *args, stacklevel=2, **kwargs)
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records as they are; formatting happens on the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def start_queue_logging(
+    handlers: list[logging.Handler],
+    loggers: tuple[str, ...],
+    level: int,
+    thread_info: bool = True,
+) -> logging.handlers.QueueListener:
+    """Attach ``loggers`` to a queue drained by a background thread into ``handlers``.
+
+    Logging calls on the event loop only append to the queue; formatting and
+    file or console I/O happen on the listener thread. Returns the started
+    listener, which must be stopped on shutdown to flush the remaining records.
+
+    With ``thread_info`` false, records stop collecting thread and process
+    details. This sets ``logging.logThreads`` and its siblings, so it applies
+    to every logger in the process, not only ``loggers``.
+    """
+    if not thread_info:
+        logging.logThreads = False
+        logging.logProcesses = False
+        logging.logMultiprocessing = False
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(log_queue)
+
+    for name in loggers:
+        logger = logging.getLogger(name)
+        logger.setLevel(level)
+        logger.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(
+        log_queue, *handlers, respect_handler_level=True
+    )
+    listener.start()
+    return listener
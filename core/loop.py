@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import sys
+import threading
+import traceback
+from time import monotonic
+
+from .metrics import Histogram
+
+__all__ = ("LoopWatchdog", "use_uvloop")
+
+logger = logging.getLogger(__name__)
+
+
+def use_uvloop() -> bool:
+    """Make new event loops uvloop loops, if uvloop is installed.
+
+    Must be called before the bot is created, since it grabs a loop on init.
+    """
+    try:
+        import uvloop
+    except ImportError:
+        logger.warning("uvloop is not installed, using the default event loop")
+        return False
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    logger.info("Using uvloop %s", uvloop.__version__)
+    return True
+
+
+class LoopWatchdog:
+    """Measures event loop scheduling lag and reports what blocks the loop.
+
+    A task sleeps for ``interval`` at a time and records how late it wakes up
+    in ``histogram``. A thread watches the task's heartbeat, and once the loop
+    has not come back for ``threshold`` seconds it samples the loop thread's
+    stack, which points at the code holding the loop while it is still stuck.
+    """
+
+    def __init__(
+        self, histogram: Histogram, interval: float = 0.1, threshold: float = 0.25
+    ) -> None:
+        if threshold <= interval:
+            raise ValueError("The stall threshold must be longer than the interval")
+
+        self.histogram = histogram
+        self.interval = interval
+        self.threshold = threshold
+        self.stalls = 0
+        self.max_lag = 0.0
+        self.last_stack: str | None = None
+        self._beat = monotonic()
+        self._loop_thread: int | None = None
+        self._task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Start watching the running loop."""
+        self._loop_thread = threading.get_ident()
+        self._beat = monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._measure())
+        self._thread = threading.Thread(
+            target=self._watch, name="banshee-loop-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _measure(self) -> None:
+        while True:
+            expected = monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = monotonic()
+            self._beat = now
+
+            lag = max(0.0, now - expected)
+            self.histogram.observe(lag)
+            # Stalls are logged by the watch thread, with the stack, not here
+            if lag > self.max_lag:
+                self.max_lag = lag
+
+    def _watch(self) -> None:
+        reported = None
+        while not self._stopped.wait(self.interval):
+            beat = self._beat
+            blocked = monotonic() - beat
+            if blocked < self.threshold or beat == reported:
+                continue
+
+            # Report each stall once, with the stack the loop is stuck in
+            reported = beat
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame)) if frame else "unavailable\n"
+            self.stalls += 1
+            self.last_stack = stack
+            logger.warning(
+                "Event loop blocked for over %.0fms, currently in:\n%s",
+                blocked * 1000,
+                stack.rstrip(),
+            )
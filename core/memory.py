@@ -0,0 +1,61 @@
+import logging
+import resource
+import sys
+from os import sysconf
+
+import discord
+
+__all__ = ("cache_counts", "log_memory_report", "resident_memory")
+
+logger = logging.getLogger(__name__)
+
+# Guilds with the most cached objects are listed individually in reports
+TOP_GUILDS = 10
+
+
+def resident_memory() -> int:
+    """Current resident set size in bytes, or the peak where that is unavailable."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * sysconf("SC_PAGE_SIZE")
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Reported in bytes on macOS and KiB elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def cache_counts(guild: discord.Guild) -> dict[str, int]:
+    return {
+        "members": len(guild.members),
+        "channels": len(guild.channels),
+        "threads": len(guild.threads),
+        "roles": len(guild.roles),
+        "emojis": len(guild.emojis),
+        "stickers": len(guild.stickers),
+    }
+
+
+def log_memory_report(bot: discord.Client) -> None:
+    """Log resident memory, client-wide caches and the largest per-guild caches."""
+    guilds = {guild.id: cache_counts(guild) for guild in bot.guilds}
+    totals: dict[str, int] = {}
+    for counts in guilds.values():
+        for key, value in counts.items():
+            totals[key] = totals.get(key, 0) + value
+
+    logger.info(
+        "Memory: %.1f MiB resident, %d guilds, %d users, %d messages cached; %s",
+        resident_memory() / 1024 / 1024,
+        len(guilds),
+        len(bot.users),
+        len(bot.cached_messages),
+        ", ".join(f"{value} {key}" for key, value in totals.items()),
+    )
+
+    largest = sorted(guilds.items(), key=lambda item: sum(item[1].values()), reverse=True)
+    for guild_id, counts in largest[:TOP_GUILDS]:
+        logger.info(
+            "Guild %s: %s",
+            guild_id,
+            ", ".join(f"{value} {key}" for key, value in counts.items()),
+        )
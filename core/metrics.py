@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import os
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Callable
+from math import inf
+
+__all__ = ("Histogram", "Metrics", "serve_metrics", "write_metrics")
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds, from 10µs (an in-memory lookup) up to 10s (a slow reply)
+BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, inf,
+)  # fmt: skip
+
+
+class Histogram:
+    """Fixed-bucket latency histogram, cheap enough to observe per message."""
+
+    __slots__ = ("name", "help", "counts", "sum", "count")
+
+    def __init__(self, name: str, help: str) -> None:
+        self.name = name
+        self.help = help
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile as the upper bound of the bucket containing it."""
+        if not self.count:
+            return 0.0
+
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= target:
+                return bound if bound != inf else BUCKETS[-2]
+        return BUCKETS[-2]
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            le = "+Inf" if bound == inf else repr(bound)
+            lines.append(f'{self.name}_bucket{{le="{le}"}} {seen}')
+        lines.append(f"{self.name}_sum {self.sum}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+
+class Metrics:
+    """Runtime metrics for message dispatch, exportable in Prometheus format.
+
+    Other components register their own counters and gauges as callbacks with
+    :meth:`register`, which are only evaluated when the metrics are rendered.
+    """
+
+    def __init__(self) -> None:
+        self.parse = Histogram(
+            "banshee_dispatch_parse_seconds", "Time spent parsing a trigger"
+        )
+        self.lookup = Histogram(
+            "banshee_dispatch_lookup_seconds", "Time spent looking up a command"
+        )
+        self.reply = Histogram(
+            "banshee_dispatch_reply_seconds", "Time spent sending a reply"
+        )
+        self.loop_lag = Histogram(
+            "banshee_event_loop_lag_seconds", "How late the event loop ran a timer"
+        )
+        self.messages: Counter[int] = Counter()
+        self._callbacks: dict[str, tuple[str, str, Callable[[], float]]] = {}
+
+    @property
+    def histograms(self) -> tuple[Histogram, ...]:
+        return (self.parse, self.lookup, self.reply, self.loop_lag)
+
+    def register(
+        self, name: str, help: str, callback: Callable[[], float], kind: str = "gauge"
+    ) -> None:
+        self._callbacks[name] = (kind, help, callback)
+
+    def values(self) -> dict[str, float]:
+        return {name: callback() for name, (_, _, callback) in self._callbacks.items()}
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for histogram in self.histograms:
+            lines.extend(histogram.render())
+
+        lines.append("# HELP banshee_messages_total Guild messages seen")
+        lines.append("# TYPE banshee_messages_total counter")
+        for guild_id, count in self.messages.items():
+            lines.append(f'banshee_messages_total{{guild="{guild_id}"}} {count}')
+
+        for name, (kind, help, callback) in self._callbacks.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {callback()}")
+
+        return "\n".join(lines) + "\n"
+
+
+async def serve_metrics(metrics: Metrics, port: int) -> asyncio.Server:
+    """Serve the metrics on ``127.0.0.1:port`` for a local Prometheus scraper."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            # Any request gets the metrics; only drain the request headers
+            while (await reader.readline()).strip():
+                pass
+
+            body = metrics.render().encode()
+            writer.write(
+                b"HTTP/1.0 200 OK\r\n"
+                b"Content-Type: text/plain; version=0.0.4\r\n"
+                b"Content-Length: %d\r\n\r\n" % len(body)
+            )
+            writer.write(body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", port)
+    logger.info("Serving metrics on http://127.0.0.1:%d/metrics", port)
+    return server
+
+
+def write_metrics(text: str, path: str) -> None:
+    """Atomically write rendered metrics to ``path``, e.g. for node_exporter's textfile collector."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(tmp, path)
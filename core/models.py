@@ -1,7 +1,15 @@
 from tortoise import fields
 from tortoise.models import Model
 
-__all__ = ("GuildSettings", "CustomCommand")
+__all__ = (
+    "GuildSettings",
+    "ThrottleSettings",
+    "CustomCommand",
+    "CommandUsage",
+    "GuildMember",
+    "ApiResponse",
+    "Announcement",
+)
 
 
 class GuildSettings(Model):
@@ -17,6 +25,21 @@ class GuildSettings(Model):
         table = "guild_settings"
 
 
+class ThrottleSettings(Model):
+    id = fields.IntField(pk=True)
+    discord_guild_id = fields.BigIntField(unique=True)
+    # Custom command replies per minute; 0 disables the limit
+    user_rate = fields.IntField(default=5)
+    channel_rate = fields.IntField(default=15)
+    guild_rate = fields.IntField(default=60)
+    # Seconds in which a repeated trigger in the same channel is dropped
+    duplicate_window = fields.IntField(default=10)
+    updated_at = fields.DatetimeField(auto_now=True)
+
+    class Meta:  # type: ignore
+        table = "guild_throttle_settings"
+
+
 class CustomCommand(Model):
     id = fields.IntField(pk=True)
     discord_guild_id = fields.BigIntField()
@@ -28,4 +51,69 @@ class CustomCommand(Model):
 
     class Meta:  # type: ignore
         table = "custom_commands"
-        unique_together = (("discord_guild_id", "command_name"),)
\ No newline at end of file
+        unique_together = (("discord_guild_id", "command_name"),)
+
+
+class CommandUsage(Model):
+    id = fields.IntField(pk=True)
+    discord_guild_id = fields.BigIntField()
+    command_name = fields.CharField(max_length=50)
+    uses = fields.IntField(default=0)
+    last_used_at = fields.DatetimeField(null=True)
+
+    class Meta:  # type: ignore
+        table = "custom_command_usage"
+        unique_together = (("discord_guild_id", "command_name"),)
+        indexes = (("discord_guild_id", "uses"),)
+
+
+class GuildMember(Model):
+    id = fields.IntField(pk=True)
+    discord_guild_id = fields.BigIntField()
+    character_id = fields.BigIntField()
+    name = fields.CharField(max_length=50)
+    realm = fields.CharField(max_length=100)
+    level = fields.IntField()
+    class_id = fields.IntField()
+    race_id = fields.IntField()
+    rank = fields.IntField()
+    item_level = fields.IntField(null=True)
+    last_login_at = fields.DatetimeField(null=True)
+    updated_at = fields.DatetimeField(auto_now=True)
+
+    class Meta:  # type: ignore
+        table = "wow_guild_members"
+        unique_together = (("discord_guild_id", "character_id"),)
+
+
+class ApiResponse(Model):
+    """Last response for an API request, for conditional requests."""
+
+    id = fields.IntField(pk=True)
+    key = fields.CharField(max_length=255, unique=True)
+    etag = fields.CharField(max_length=255, null=True)
+    last_modified = fields.CharField(max_length=64, null=True)
+    body = fields.TextField()
+    fetched_at = fields.DatetimeField()
+
+    class Meta:  # type: ignore
+        table = "api_response_cache"
+
+
+class Announcement(Model):
+    id = fields.IntField(pk=True)
+    guild = fields.ForeignKeyField(
+        "models.GuildSettings", related_name="announcements", on_delete=fields.CASCADE
+    )
+    channel_id = fields.BigIntField()
+    content = fields.TextField()
+    interval_minutes = fields.IntField()
+    # The scheduler only loads announcements due soon, by range over this index
+    next_run_at = fields.DatetimeField(db_index=True)
+    last_run_at = fields.DatetimeField(null=True)
+    enabled = fields.BooleanField(default=True)
+    created_by = fields.BigIntField()
+    created_at = fields.DatetimeField(auto_now_add=True)
+
+    class Meta:  # type: ignore
+        table = "guild_announcements"
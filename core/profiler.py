@@ -0,0 +1,189 @@
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+
+from tortoise import connections
+
+__all__ = ("HandlerStats", "Profile", "QueryProfiler")
+
+logger = logging.getLogger(__name__)
+
+# Every statement Tortoise runs goes through one of these client methods
+METHODS = (
+    "execute_insert",
+    "execute_many",
+    "execute_query",
+    "execute_query_dict",
+    "execute_script",
+)
+
+# Longer statements, such as bulk inserts, are cut short in logs
+MAX_STATEMENT_LENGTH = 200
+
+current_profile: ContextVar["Profile | None"] = ContextVar(
+    "current_profile", default=None
+)
+# Set while a statement runs, so a client method calling another counts once
+in_statement: ContextVar[bool] = ContextVar("in_statement", default=False)
+
+
+class Profile:
+    """Queries run while handling a single slash command or message."""
+
+    __slots__ = ("name", "queries", "db_time", "slowest", "slowest_time", "statements")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.queries = 0
+        self.db_time = 0.0
+        self.slowest: str | None = None
+        self.slowest_time = 0.0
+        self.statements: Counter[tuple[str, str]] = Counter()
+
+    def record(self, query: str, values, elapsed: float) -> None:
+        self.queries += 1
+        self.db_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest, self.slowest_time = query, elapsed
+        self.statements[query, repr(values)] += 1
+
+    @property
+    def duplicates(self) -> int:
+        """Statements run again with the same parameters, which are never needed."""
+        return sum(count - 1 for count in self.statements.values())
+
+
+class HandlerStats:
+    """Totals over every profile of one handler."""
+
+    __slots__ = ("calls", "queries", "db_time", "max_db_time", "flagged")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.queries = 0
+        self.db_time = 0.0
+        self.max_db_time = 0.0
+        self.flagged = 0
+
+
+def profiled(method):
+    @wraps(method)
+    async def wrapper(self, query, *args, **kwargs):
+        profile = current_profile.get()
+        if profile is None or in_statement.get():
+            return await method(self, query, *args, **kwargs)
+
+        token = in_statement.set(True)
+        started = perf_counter()
+        try:
+            return await method(self, query, *args, **kwargs)
+        finally:
+            profile.record(
+                query, args[0] if args else kwargs.get("values"), perf_counter() - started
+            )
+            in_statement.reset(token)
+
+    wrapper.profiled = True
+    return wrapper
+
+
+class QueryProfiler:
+    """Counts and times the queries of each slash command and message trigger.
+
+    :meth:`install` wraps the statement methods of the database client classes
+    in use, including their transaction wrappers, and :meth:`profile` collects
+    the statements run in its context into a :class:`Profile`. Handlers that
+    run more than ``max_queries`` queries, spend more than ``max_db_time``
+    seconds in the database, run a statement slower than ``slow_query`` or
+    repeat a statement with the same parameters are logged as warnings, and
+    every profile is logged at debug level. Totals per handler are kept in
+    :attr:`handlers`.
+    """
+
+    def __init__(
+        self,
+        max_queries: int = 3,
+        max_db_time: float = 0.05,
+        slow_query: float = 0.02,
+    ) -> None:
+        self.max_queries = max_queries
+        self.max_db_time = max_db_time
+        self.slow_query = slow_query
+        self.handlers: dict[str, HandlerStats] = {}
+
+    def install(self) -> None:
+        """Wrap the client classes of every configured connection."""
+        classes = set()
+        for name in connections.db_config:
+            pending = [type(connections.get(name))]
+            while pending:
+                cls = pending.pop()
+                classes.add(cls)
+                pending.extend(cls.__subclasses__())
+
+        for cls in classes:
+            for method_name in METHODS:
+                # Wrap where the method is defined, so subclasses share it
+                owner = next(
+                    (klass for klass in cls.__mro__ if method_name in vars(klass)), None
+                )
+                if owner is None:
+                    continue
+                method = vars(owner)[method_name]
+                if not getattr(method, "profiled", False):
+                    setattr(owner, method_name, profiled(method))
+
+    @contextmanager
+    def profile(self, name: str):
+        profile = Profile(name)
+        token = current_profile.set(profile)
+        try:
+            yield profile
+        finally:
+            current_profile.reset(token)
+            self.finish(profile)
+
+    def finish(self, profile: Profile) -> None:
+        stats = self.handlers.get(profile.name)
+        if stats is None:
+            stats = self.handlers[profile.name] = HandlerStats()
+        stats.calls += 1
+        stats.queries += profile.queries
+        stats.db_time += profile.db_time
+        stats.max_db_time = max(stats.max_db_time, profile.db_time)
+
+        if not profile.queries:
+            return
+
+        problems = []
+        if profile.queries > self.max_queries:
+            problems.append(f"{profile.queries} queries")
+        if profile.db_time > self.max_db_time:
+            problems.append(f"{profile.db_time * 1000:.1f}ms in the database")
+        if profile.slowest_time > self.slow_query:
+            problems.append(f"a {profile.slowest_time * 1000:.1f}ms statement")
+        if profile.duplicates:
+            problems.append(f"{profile.duplicates} repeated statements")
+
+        summary = "%s ran %d queries in %.1fms, slowest %.1fms: %s"
+        arguments = (
+            profile.name,
+            profile.queries,
+            profile.db_time * 1000,
+            profile.slowest_time * 1000,
+            (profile.slowest or "")[:MAX_STATEMENT_LENGTH],
+        )
+        if problems:
+            stats.flagged += 1
+            logger.warning(summary + " (%s)", *arguments, ", ".join(problems))
+        else:
+            logger.debug(summary, *arguments)
+
+    def top(self, count: int = 5) -> list[tuple[str, HandlerStats]]:
+        """Handlers with the most total database time."""
+        return sorted(
+            self.handlers.items(), key=lambda item: item[1].db_time, reverse=True
+        )[:count]
@@ -0,0 +1,143 @@
+from time import monotonic
+from typing import NamedTuple
+
+from .models import ThrottleSettings
+
+__all__ = ("Limits", "ReplyLimiter")
+
+# Idle buckets and duplicate markers are swept this often, in seconds
+SWEEP_INTERVAL = 60.0
+
+
+class Limits(NamedTuple):
+    user_rate: int = 5
+    channel_rate: int = 15
+    guild_rate: int = 60
+    duplicate_window: int = 10
+
+
+class TokenBucket:
+    """Holds up to a minute's worth of replies and refills continuously."""
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, rate: int, now: float) -> None:
+        self.tokens = float(rate)
+        self.updated = now
+
+    def refill(self, rate: int, now: float) -> float:
+        self.tokens = min(rate, self.tokens + (now - self.updated) * rate / 60)
+        self.updated = now
+        return self.tokens
+
+
+class ReplyLimiter:
+    """Throttles custom command replies per guild, channel and user.
+
+    Each scope has its own token bucket, and a reply is only sent when every
+    bucket has a token left. A trigger repeated in the same channel within
+    the guild's duplicate window is dropped, since the earlier reply is still
+    on screen. Buckets are dropped once idle long enough to be full again, so
+    memory only grows with recent activity.
+    """
+
+    def __init__(self, default: Limits = Limits()) -> None:
+        self.default = default
+        self.throttled = 0
+        self.collapsed = 0
+        self._complete = False
+        self._limits: dict[int, Limits] = {}
+        self._buckets: dict[tuple[str, int, int], TokenBucket] = {}
+        self._recent: dict[tuple[int, str], float] = {}
+        self._swept = monotonic()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def load(self) -> None:
+        """Load every guild's throttle settings in a single query."""
+        rows = await ThrottleSettings.all().values_list(
+            "discord_guild_id",
+            "user_rate",
+            "channel_rate",
+            "guild_rate",
+            "duplicate_window",
+        )
+        self._limits = {guild_id: Limits(*limits) for guild_id, *limits in rows}
+        self._complete = True
+
+    async def limits(self, guild_id: int) -> Limits:
+        limits = self._limits.get(guild_id)
+        if limits is None:
+            settings = None
+            if not self._complete:
+                settings = await ThrottleSettings.get_or_none(discord_guild_id=guild_id)
+            limits = self.default if settings is None else Limits(
+                settings.user_rate,
+                settings.channel_rate,
+                settings.guild_rate,
+                settings.duplicate_window,
+            )
+            self._limits[guild_id] = limits
+        return limits
+
+    def configure(self, guild_id: int, limits: Limits) -> None:
+        self._limits[guild_id] = limits
+
+    async def acquire(
+        self, guild_id: int, channel_id: int, user_id: int, command_name: str
+    ) -> bool:
+        """Return whether a reply may be sent, consuming a token from each scope."""
+        limits = await self.limits(guild_id)
+        now = monotonic()
+        if now - self._swept >= SWEEP_INTERVAL:
+            self.sweep(now)
+
+        trigger = (channel_id, command_name)
+        if limits.duplicate_window:
+            last = self._recent.get(trigger)
+            if last is not None and now - last < limits.duplicate_window:
+                self.collapsed += 1
+                return False
+
+        # User buckets are per guild, so each guild's limits apply on their own
+        buckets = []
+        for key, rate in (
+            (("user", guild_id, user_id), limits.user_rate),
+            (("channel", guild_id, channel_id), limits.channel_rate),
+            (("guild", guild_id, guild_id), limits.guild_rate),
+        ):
+            if not rate:
+                continue
+
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(rate, now)
+            if bucket.refill(rate, now) < 1:
+                self.throttled += 1
+                return False
+            buckets.append(bucket)
+
+        for bucket in buckets:
+            bucket.tokens -= 1
+        if limits.duplicate_window:
+            self._recent[trigger] = now
+        return True
+
+    def sweep(self, now: float) -> None:
+        # Every bucket refills completely within a minute
+        self._buckets = {
+            key: bucket
+            for key, bucket in self._buckets.items()
+            if now - bucket.updated < 60
+        }
+        window = max(
+            [self.default.duplicate_window]
+            + [limits.duplicate_window for limits in self._limits.values()]
+        )
+        self._recent = {
+            trigger: last
+            for trigger, last in self._recent.items()
+            if now - last < window
+        }
+        self._swept = now
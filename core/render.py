@@ -0,0 +1,134 @@
+import re
+import sys
+from hashlib import blake2b
+from time import perf_counter
+from weakref import WeakValueDictionary
+
+__all__ = (
+    "MESSAGE_LIMIT",
+    "PayloadCache",
+    "Reply",
+    "format_seconds",
+    "split_message",
+)
+
+# Discord rejects message content longer than this
+MESSAGE_LIMIT = 2000
+FENCE = "```"
+# Room kept at the end of a chunk to close a code block left open
+CLOSE_FENCE = "\n" + FENCE
+# Only a short identifier is carried over as the language of a reopened block
+LANGUAGE = re.compile(r"[A-Za-z0-9_+#.-]{1,20}")
+# The longest prefix reopening a block, "```" plus a language and a newline
+MAX_PREFIX = len(FENCE) + 20 + 1
+
+
+def format_seconds(seconds: float) -> str:
+    """A duration in the most readable unit, e.g. ``850µs`` or ``12.5ms``."""
+    if seconds < 0.001:
+        return f"{seconds * 1_000_000:.0f}µs"
+    if seconds < 1:
+        return f"{seconds * 1000:.1f}ms"
+    return f"{seconds:.2f}s"
+
+
+def fence_state(text: str, language: str | None) -> str | None:
+    """The language of the code block open after ``text``, or ``None``.
+
+    ``language`` is the block already open where ``text`` starts. A line that
+    opens and closes a block, such as ```` ```inline``` ````, leaves it as is.
+    """
+    for line in text.split("\n"):
+        stripped = line.lstrip()
+        if not stripped.startswith(FENCE) or FENCE in stripped[len(FENCE) :]:
+            continue
+        if language is None:
+            info = stripped[len(FENCE) :].split(maxsplit=1)
+            language = info[0] if info and LANGUAGE.fullmatch(info[0]) else ""
+        else:
+            language = None
+    return language
+
+
+def split_message(content: str, limit: int = MESSAGE_LIMIT) -> list[str]:
+    """Split ``content`` into messages of at most ``limit`` characters.
+
+    Splits happen at the last blank line, line break or space that fits, in
+    that order, and only mid-word when a chunk has none. A code block cut in
+    two is closed at the end of one message and reopened, with its language,
+    at the start of the next, so each message renders on its own.
+    """
+    if len(content) <= limit:
+        return [content]
+    if limit <= MAX_PREFIX + len(CLOSE_FENCE):
+        raise ValueError(f"limit must be more than {MAX_PREFIX + len(CLOSE_FENCE)}")
+
+    chunks = []
+    language = None
+    rest = content
+    while rest:
+        prefix = "" if language is None else f"{FENCE}{language}\n"
+        budget = limit - len(prefix)
+        if len(rest) <= budget:
+            chunks.append(prefix + rest)
+            break
+
+        window = rest[: budget - len(CLOSE_FENCE)]
+        # Cutting in the first half would only produce more, shorter messages
+        floor = len(window) // 2
+        for separator in ("\n\n", "\n", " "):
+            cut = window.rfind(separator, floor)
+            if cut > 0:
+                break
+        else:
+            cut = len(window)
+
+        piece, rest = window[:cut], rest[cut:].lstrip("\n")
+        language = fence_state(piece, language)
+        chunks.append(prefix + piece + (CLOSE_FENCE if language is not None else ""))
+    return chunks
+
+
+class Reply:
+    """The ready-to-send messages for one command content."""
+
+    __slots__ = ("chunks", "size", "__weakref__")
+
+    def __init__(self, chunks: list[str]) -> None:
+        self.chunks = tuple(chunks)
+        self.size = sys.getsizeof(self.chunks) + sum(
+            sys.getsizeof(chunk) for chunk in self.chunks
+        )
+
+
+class PayloadCache:
+    """Rendered replies keyed by a hash of the command content.
+
+    Content is split into messages once, when a command is loaded or saved,
+    and identical content in different guilds shares a single :class:`Reply`.
+    Entries are held weakly, so a reply is dropped as soon as no cached
+    command refers to it and the cache never outgrows the command cache.
+    """
+
+    def __init__(self, limit: int = MESSAGE_LIMIT) -> None:
+        self.limit = limit
+        self.hits = 0
+        self.renders = 0
+        self.render_time = 0.0
+        self._replies: WeakValueDictionary[bytes, Reply] = WeakValueDictionary()
+
+    def __len__(self) -> int:
+        return len(self._replies)
+
+    def render(self, content: str) -> Reply:
+        key = blake2b(content.encode(), digest_size=16).digest()
+        reply = self._replies.get(key)
+        if reply is not None:
+            self.hits += 1
+            return reply
+
+        started = perf_counter()
+        reply = self._replies[key] = Reply(split_message(content, self.limit))
+        self.render_time += perf_counter() - started
+        self.renders += 1
+        return reply
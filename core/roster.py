@@ -0,0 +1,203 @@
+import asyncio
+import logging
+from collections.abc import Callable
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from tortoise.transactions import in_transaction
+
+from .blizzard import BlizzardClient, ResponseCache, slug
+from .models import GuildMember, GuildSettings
+
+__all__ = ("RosterDiff", "RosterSync")
+
+logger = logging.getLogger(__name__)
+
+LOCALE = "en_US"
+# Roster fields compared to decide whether a stored member changed
+ROSTER_FIELDS = ("name", "realm", "level", "class_id", "race_id", "rank")
+PROFILE_FIELDS = ("item_level", "last_login_at")
+
+
+class RosterDiff(NamedTuple):
+    added: int = 0
+    removed: int = 0
+    changed: int = 0
+    unchanged: int = 0
+
+
+def roster_member(entry: dict) -> dict:
+    character = entry["character"]
+    return {
+        "name": character["name"],
+        "realm": character["realm"]["slug"],
+        "level": character.get("level", 0),
+        "class_id": character.get("playable_class", {}).get("id", 0),
+        "race_id": character.get("playable_race", {}).get("id", 0),
+        "rank": entry.get("rank", 0),
+    }
+
+
+def profile_fields(profile: dict) -> dict:
+    last_login = profile.get("last_login_timestamp")
+    return {
+        "item_level": profile.get("equipped_item_level"),
+        "last_login_at": datetime.fromtimestamp(last_login / 1000, timezone.utc)
+        if last_login
+        else None,
+    }
+
+
+class RosterSync:
+    """Keeps the stored rosters of configured WoW guilds up to date.
+
+    Each sync fetches a guild's roster and the profiles of its characters, then
+    writes only the members that were added, removed or changed, in bulk. An
+    unchanged roster costs one conditional request and no member writes, and profiles
+    fetched within ``profile_max_age`` seconds are not requested again.
+    ``owns`` selects the guilds this process is responsible for, e.g. those on
+    its shards, so cluster workers don't sync the same guilds.
+    """
+
+    def __init__(
+        self,
+        client: BlizzardClient,
+        profile_max_age: float = 6 * 3600,
+        owns: Callable[[int], bool] = lambda guild_id: True,
+    ) -> None:
+        self.client = client
+        self.profile_max_age = profile_max_age
+        self.owns = owns
+
+    async def sync_all(self) -> dict[int, RosterDiff]:
+        guilds = [
+            settings
+            for settings in await GuildSettings.filter(
+                wow_guild_name__isnull=False,
+                wow_region__isnull=False,
+                wow_realm__isnull=False,
+            )
+            if self.owns(settings.discord_guild_id)
+        ]
+        results = await asyncio.gather(
+            *(self.sync_guild(settings) for settings in guilds),
+            return_exceptions=True,
+        )
+
+        diffs = {}
+        for settings, result in zip(guilds, results):
+            if isinstance(result, BaseException):
+                logger.error(
+                    "Failed to sync roster of %s (%s-%s)",
+                    settings.wow_guild_name,
+                    settings.wow_region,
+                    settings.wow_realm,
+                    exc_info=result,
+                )
+            else:
+                diffs[settings.discord_guild_id] = result
+        return diffs
+
+    async def sync_guild(self, settings: GuildSettings) -> RosterDiff:
+        region = settings.wow_region
+        namespace = f"namespace=profile-{region}&locale={LOCALE}"
+        roster_path = (
+            f"/data/wow/guild/{slug(settings.wow_realm)}/"
+            f"{slug(settings.wow_guild_name)}/roster?{namespace}"
+        )
+
+        cache = ResponseCache()
+        await cache.load([f"{region}:{roster_path}"])
+        roster, roster_changed = await self.client.get(region, roster_path, cache)
+        if roster is None:
+            logger.warning(
+                "Guild %s not found on %s-%s",
+                settings.wow_guild_name,
+                region,
+                settings.wow_realm,
+            )
+            roster = {"members": []}
+
+        members = {
+            entry["character"]["id"]: roster_member(entry)
+            for entry in roster.get("members", [])
+        }
+        existing = {
+            member.character_id: member
+            for member in await GuildMember.filter(
+                discord_guild_id=settings.discord_guild_id
+            )
+        }
+
+        # Profiles of new members are always fetched, others once they are stale
+        paths = {
+            character_id: f"/profile/wow/character/{member['realm']}/"
+            f"{member['name'].lower()}?{namespace}"
+            for character_id, member in members.items()
+        }
+        await cache.load([f"{region}:{path}" for path in paths.values()])
+        due = [
+            character_id
+            for character_id, path in paths.items()
+            if character_id not in existing
+            or not cache.fresh(f"{region}:{path}", self.profile_max_age)
+        ]
+        profiles = await asyncio.gather(
+            *(self.client.get(region, paths[character_id], cache) for character_id in due),
+            return_exceptions=True,
+        )
+        for character_id, result in zip(due, profiles):
+            if isinstance(result, BaseException):
+                # Keep the stored profile; it is requested again next sync
+                logger.debug("Failed to fetch profile %s: %r", paths[character_id], result)
+                continue
+
+            profile, modified = result
+            if profile is not None and (modified or character_id not in existing):
+                members[character_id].update(profile_fields(profile))
+
+        added, changed, unchanged = [], [], 0
+        for character_id, fields in members.items():
+            member = existing.pop(character_id, None)
+            if member is None:
+                added.append(
+                    GuildMember(
+                        discord_guild_id=settings.discord_guild_id,
+                        character_id=character_id,
+                        **fields,
+                    )
+                )
+            elif any(getattr(member, name) != value for name, value in fields.items()):
+                for name, value in fields.items():
+                    setattr(member, name, value)
+                changed.append(member)
+            else:
+                unchanged += 1
+
+        async with in_transaction("default") as connection:
+            if added:
+                await GuildMember.bulk_create(added, batch_size=500, using_db=connection)
+            if changed:
+                await GuildMember.bulk_update(
+                    changed,
+                    fields=[*ROSTER_FIELDS, *PROFILE_FIELDS],
+                    batch_size=500,
+                    using_db=connection,
+                )
+            if existing:
+                await GuildMember.filter(
+                    discord_guild_id=settings.discord_guild_id,
+                    character_id__in=list(existing),
+                ).using_db(connection).delete()
+            await cache.flush(using_db=connection)
+
+        diff = RosterDiff(len(added), len(existing), len(changed), unchanged)
+        if roster_changed or any(diff[:3]):
+            logger.info(
+                "Synced roster of %s: %d added, %d removed, %d changed",
+                settings.wow_guild_name,
+                diff.added,
+                diff.removed,
+                diff.changed,
+            )
+        return diff
@@ -0,0 +1,229 @@
+import asyncio
+import heapq
+import logging
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta, timezone
+from math import floor
+from time import monotonic, time
+
+from .models import Announcement
+
+__all__ = ("AnnouncementScheduler", "Job", "next_run_after")
+
+logger = logging.getLogger(__name__)
+
+# Updated run times are written in batches of this many rows
+BATCH_SIZE = 500
+
+
+class Job:
+    __slots__ = ("id", "guild_id", "channel_id", "content", "interval", "next_run")
+
+    def __init__(
+        self,
+        id: int,
+        guild_id: int,
+        channel_id: int,
+        content: str,
+        interval: float,
+        next_run: float,
+    ) -> None:
+        self.id = id
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.content = content
+        self.interval = interval
+        self.next_run = next_run
+
+
+class AnnouncementScheduler:
+    """Runs recurring announcements from one task, however many are stored.
+
+    Only announcements due within ``horizon`` seconds are held in memory, in a
+    heap ordered by their next run; the window is refilled by a range query on
+    the indexed ``next_run_at`` column before it runs out. Runs missed while
+    the bot was down are coalesced into a single send, and the next run time
+    is written back before sending, so a restart never repeats a post. Sends go
+    through a queue drained at ``send_rate`` per second, so many announcements
+    due at the same minute are spread out instead of hitting rate limits.
+
+    ``send`` posts to a channel and returns ``False`` if the channel is gone,
+    which disables the announcement. ``owns`` selects the guilds this process
+    is responsible for, e.g. those on its shards.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[int, str], Awaitable[bool]],
+        owns: Callable[[int], bool] = lambda guild_id: True,
+        horizon: float = 600.0,
+        send_rate: float = 5.0,
+    ) -> None:
+        self.send = send
+        self.owns = owns
+        self.horizon = horizon
+        self.send_rate = send_rate
+        self.sent = 0
+        self.coalesced = 0
+        self._jobs: dict[int, Job] = {}
+        self._heap: list[tuple[float, int]] = []
+        self._loaded_until = 0.0
+        self._queue: asyncio.Queue[Job] = asyncio.Queue()
+        self._wake = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._run()),
+            asyncio.create_task(self._send_loop()),
+        ]
+
+    def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def schedule(self, announcement: Announcement, guild_id: int) -> None:
+        """Pick up a created or edited announcement if it is due soon."""
+        self._jobs.pop(announcement.id, None)
+        next_run = announcement.next_run_at.timestamp()
+        if (
+            not announcement.enabled
+            or next_run >= self._loaded_until
+            or not self.owns(guild_id)
+        ):
+            return
+
+        job = Job(
+            announcement.id,
+            guild_id,
+            announcement.channel_id,
+            announcement.content,
+            announcement.interval_minutes * 60,
+            next_run,
+        )
+        self._jobs[job.id] = job
+        heapq.heappush(self._heap, (next_run, job.id))
+        self._wake.set()
+
+    def unschedule(self, announcement_id: int) -> None:
+        # Its heap entry is skipped once popped
+        self._jobs.pop(announcement_id, None)
+
+    async def load(self, now: float) -> None:
+        """Load the announcements due before ``now + horizon``."""
+        until = now + self.horizon
+        announcements = Announcement.filter(
+            enabled=True, next_run_at__lt=datetime.fromtimestamp(until, timezone.utc)
+        )
+        if self._loaded_until:
+            announcements = announcements.filter(
+                next_run_at__gte=datetime.fromtimestamp(self._loaded_until, timezone.utc)
+            )
+
+        rows = await announcements.values_list(
+            "id",
+            "guild__discord_guild_id",
+            "channel_id",
+            "content",
+            "interval_minutes",
+            "next_run_at",
+        )
+        for id, guild_id, channel_id, content, interval, next_run_at in rows:
+            if id in self._jobs or not self.owns(guild_id):
+                continue
+            job = Job(id, guild_id, channel_id, content, interval * 60, next_run_at.timestamp())
+            self._jobs[id] = job
+            self._heap.append((job.next_run, id))
+        heapq.heapify(self._heap)
+        self._loaded_until = until
+
+    async def tick(self, now: float) -> list[Job]:
+        """Queue every job due by ``now`` and persist their next run times."""
+        if now >= self._loaded_until - self.horizon / 2:
+            await self.load(now)
+
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            next_run, id = heapq.heappop(self._heap)
+            job = self._jobs.get(id)
+            if job is None or job.next_run != next_run:
+                continue
+
+            # Runs missed while offline collapse into the one sent now
+            missed = floor((now - job.next_run) / job.interval)
+            self.coalesced += missed
+            job.next_run += job.interval * (missed + 1)
+            if job.next_run < self._loaded_until:
+                heapq.heappush(self._heap, (job.next_run, id))
+            else:
+                del self._jobs[id]
+            due.append(job)
+
+        if due:
+            last_run = datetime.fromtimestamp(now, timezone.utc)
+            await Announcement.bulk_update(
+                [
+                    Announcement(
+                        id=job.id,
+                        next_run_at=datetime.fromtimestamp(job.next_run, timezone.utc),
+                        last_run_at=last_run,
+                    )
+                    for job in due
+                ],
+                fields=["next_run_at", "last_run_at"],
+                batch_size=BATCH_SIZE,
+            )
+            for job in due:
+                self._queue.put_nowait(job)
+        return due
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.tick(time())
+            except Exception:
+                logger.exception("Failed to run scheduled announcements")
+                # Back off rather than retrying a failing database in a loop
+                await asyncio.sleep(10)
+
+            wake_at = self._loaded_until - self.horizon / 2
+            if self._heap:
+                wake_at = min(wake_at, self._heap[0][0])
+
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), max(0.0, wake_at - time()))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _send_loop(self) -> None:
+        while True:
+            job = await self._queue.get()
+            started = monotonic()
+            try:
+                if not await self.send(job.channel_id, job.content):
+                    logger.warning(
+                        "Disabling announcement %d, channel %d is gone",
+                        job.id,
+                        job.channel_id,
+                    )
+                    self.unschedule(job.id)
+                    await Announcement.filter(id=job.id).update(enabled=False)
+                else:
+                    self.sent += 1
+            except Exception:
+                logger.exception("Failed to send announcement %d", job.id)
+
+            if self.send_rate:
+                await asyncio.sleep(max(0.0, 1 / self.send_rate - (monotonic() - started)))
+
+
+def next_run_after(start: datetime, interval: timedelta, now: datetime) -> datetime:
+    """The first run of a schedule starting at ``start`` that is not in the past."""
+    if start >= now:
+        return start
+    return start + interval * (floor((now - start) / interval) + 1)
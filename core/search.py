@@ -0,0 +1,242 @@
+import logging
+import re
+from math import log
+from typing import NamedTuple
+
+from tortoise import connections
+
+from .models import CustomCommand
+
+__all__ = ("CommandSearch", "SearchResult")
+
+logger = logging.getLogger(__name__)
+
+# Letters and digits; underscores in command names separate words
+TOKEN = re.compile(r"[^\W_]+")
+# Matches in a command's name count this many times as much as in its content
+NAME_WEIGHT = 5
+SNIPPET_LENGTH = 80
+
+FTS_TABLE = "custom_commands_fts"
+
+SQLITE_SCHEMA = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    command_name, content, discord_guild_id UNINDEXED,
+    content='custom_commands', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON custom_commands BEGIN
+    INSERT INTO {FTS_TABLE} (rowid, command_name, content, discord_guild_id)
+    VALUES (new.id, new.command_name, new.content, new.discord_guild_id);
+END;
+CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON custom_commands BEGIN
+    INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, command_name, content, discord_guild_id)
+    VALUES ('delete', old.id, old.command_name, old.content, old.discord_guild_id);
+END;
+CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE ON custom_commands BEGIN
+    INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, command_name, content, discord_guild_id)
+    VALUES ('delete', old.id, old.command_name, old.content, old.discord_guild_id);
+    INSERT INTO {FTS_TABLE} (rowid, command_name, content, discord_guild_id)
+    VALUES (new.id, new.command_name, new.content, new.discord_guild_id);
+END;
+INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild');
+"""
+
+SQLITE_QUERY = f"""
+SELECT command_name, snippet({FTS_TABLE}, 1, '**', '**', '…', 12) AS snippet
+FROM {FTS_TABLE}
+WHERE {FTS_TABLE} MATCH ? AND discord_guild_id = ?
+ORDER BY bm25({FTS_TABLE}, {NAME_WEIGHT}.0, 1.0)
+LIMIT ?
+"""
+
+# 'simple' skips stemming and stop words, as commands are not all in English
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('simple', replace(command_name, '_', ' ')), 'A') || "
+    "setweight(to_tsvector('simple', content), 'D')"
+)
+
+POSTGRES_SCHEMA = (
+    "CREATE INDEX IF NOT EXISTS custom_commands_search_idx "
+    f"ON custom_commands USING GIN (({POSTGRES_DOCUMENT}))"
+)
+
+POSTGRES_QUERY = f"""
+SELECT command_name,
+       ts_headline('simple', content, query,
+                   'StartSel=**, StopSel=**, MaxWords=15, MinWords=5') AS snippet
+FROM custom_commands, to_tsquery('simple', $1) AS query
+WHERE discord_guild_id = $2 AND ({POSTGRES_DOCUMENT}) @@ query
+ORDER BY ts_rank({POSTGRES_DOCUMENT}, query) DESC
+LIMIT $3
+"""
+
+
+class SearchResult(NamedTuple):
+    command_name: str
+    snippet: str
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN.findall(text.lower())
+
+
+def snippet(content: str, tokens: list[str]) -> str:
+    """Cut ``content`` down to the text around the first matching word."""
+    lowered = content.lower()
+    positions = [lowered.find(token) for token in tokens]
+    start = min((position for position in positions if position >= 0), default=0)
+    start = max(0, start - SNIPPET_LENGTH // 4)
+    text = content[start : start + SNIPPET_LENGTH].replace("\n", " ")
+    prefix = "…" if start else ""
+    suffix = "…" if start + SNIPPET_LENGTH < len(content) else ""
+    return f"{prefix}{text}{suffix}"
+
+
+class InvertedIndex:
+    """A guild's commands indexed by word, for ranking without a database index."""
+
+    def __init__(self, commands: dict[str, str]) -> None:
+        self.postings: dict[str, dict[str, int]] = {}
+        self.documents: dict[str, tuple[dict[str, int], str]] = {}
+        for command_name, content in commands.items():
+            self.set(command_name, content)
+
+    def set(self, command_name: str, content: str) -> None:
+        self.remove(command_name)
+
+        weights: dict[str, int] = {}
+        for token in tokenize(command_name):
+            weights[token] = weights.get(token, 0) + NAME_WEIGHT
+        for token in tokenize(content):
+            weights[token] = weights.get(token, 0) + 1
+
+        for token, weight in weights.items():
+            self.postings.setdefault(token, {})[command_name] = weight
+        self.documents[command_name] = (weights, content)
+
+    def remove(self, command_name: str) -> None:
+        document = self.documents.pop(command_name, None)
+        if document is None:
+            return
+
+        for token in document[0]:
+            postings = self.postings[token]
+            del postings[command_name]
+            if not postings:
+                del self.postings[token]
+
+    def search(self, tokens: list[str], limit: int) -> list[SearchResult]:
+        # Every word must match; the last one may be incomplete
+        scores: dict[str, float] | None = None
+        for position, token in enumerate(tokens):
+            if position == len(tokens) - 1:
+                terms = [term for term in self.postings if term.startswith(token)]
+            else:
+                terms = [token] if token in self.postings else []
+
+            matches: dict[str, float] = {}
+            for term in terms:
+                postings = self.postings[term]
+                idf = log(1 + len(self.documents) / len(postings))
+                for command_name, weight in postings.items():
+                    matches[command_name] = matches.get(command_name, 0.0) + weight * idf
+
+            if scores is None:
+                scores = matches
+            else:
+                scores = {
+                    command_name: score + matches[command_name]
+                    for command_name, score in scores.items()
+                    if command_name in matches
+                }
+            if not scores:
+                return []
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [
+            SearchResult(command_name, snippet(self.documents[command_name][1], tokens))
+            for command_name, _ in ranked
+        ]
+
+
+class CommandSearch:
+    """Ranked full-text search over custom command names and content.
+
+    Uses an FTS5 table kept in sync by triggers on SQLite, and a GIN expression
+    index on Postgres, so both are maintained by the database on every write.
+    Where neither is available, each guild's commands are indexed in memory on
+    first search and kept up to date through :meth:`set` and :meth:`remove`.
+    """
+
+    def __init__(self) -> None:
+        self.backend = "memory"
+        self._indexes: dict[int, InvertedIndex] = {}
+
+    async def setup(self) -> None:
+        """Create the database index if needed and pick the backend."""
+        connection = connections.get("default")
+        dialect = connection.capabilities.dialect
+
+        if dialect == "sqlite":
+            _, rows = await connection.execute_query(
+                "SELECT 1 FROM sqlite_master WHERE name = ?", [FTS_TABLE]
+            )
+            if not rows:
+                try:
+                    await connection.execute_script(SQLITE_SCHEMA)
+                except Exception:
+                    logger.warning("SQLite has no FTS5, searching in memory instead")
+                    return
+                logger.info("Created full-text search index")
+            self.backend = "sqlite"
+        elif dialect == "postgres":
+            await connection.execute_script(POSTGRES_SCHEMA)
+            self.backend = "postgres"
+
+    async def search(
+        self, guild_id: int, query: str, limit: int = 10
+    ) -> list[SearchResult]:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        if self.backend == "memory":
+            index = self._indexes.get(guild_id)
+            if index is None:
+                index = await self.load_guild(guild_id)
+            return index.search(tokens, limit)
+
+        connection = connections.get("default")
+        if self.backend == "sqlite":
+            # Quoted words, with prefix matching on the last one
+            match = " ".join(f'"{token}"' for token in tokens) + "*"
+            sql = SQLITE_QUERY
+        else:
+            match = " & ".join(tokens) + ":*"
+            sql = POSTGRES_QUERY
+
+        rows = await connection.execute_query_dict(sql, [match, guild_id, limit])
+        return [SearchResult(row["command_name"], row["snippet"]) for row in rows]
+
+    async def load_guild(self, guild_id: int) -> InvertedIndex:
+        rows = await CustomCommand.filter(discord_guild_id=guild_id).values_list(
+            "command_name", "content"
+        )
+        index = self._indexes[guild_id] = InvertedIndex(dict(rows))
+        return index
+
+    def set(self, guild_id: int, command_name: str, content: str) -> None:
+        """Index a created or edited command; the database indexes maintain themselves."""
+        index = self._indexes.get(guild_id)
+        if index is not None:
+            index.set(command_name, content)
+
+    def remove(self, guild_id: int, command_name: str) -> None:
+        index = self._indexes.get(guild_id)
+        if index is not None:
+            index.remove(command_name)
+
+    def forget(self, guild_id: int) -> None:
+        """Drop a guild's in-memory index, e.g. after a bulk import."""
+        self._indexes.pop(guild_id, None)
@@ -0,0 +1,186 @@
+import asyncio
+from time import monotonic
+
+import discord
+
+__all__ = ("Session", "SessionLimitError", "SessionManager")
+
+# Sessions that outlived their timeout are swept this often, in seconds
+SWEEP_INTERVAL = 60.0
+# Extra time given to Pycord's own timeout before a session is force-closed
+GRACE = 5.0
+
+
+class SessionLimitError(Exception):
+    """Raised when opening a session would exceed the global or guild cap."""
+
+
+class Session:
+    """A pending modal or view, open until it finishes or expires."""
+
+    __slots__ = (
+        "manager",
+        "item",
+        "guild_id",
+        "user_id",
+        "expires_at",
+        "readonly",
+        "closed",
+    )
+
+    def __init__(
+        self,
+        manager: "SessionManager",
+        item: discord.ui.Modal | discord.ui.View,
+        guild_id: int,
+        user_id: int,
+        expires_at: float,
+        readonly: bool = False,
+    ) -> None:
+        self.manager = manager
+        self.item = item
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.expires_at = expires_at
+        self.readonly = readonly
+        self.closed = False
+
+    async def wait(self) -> None:
+        """Wait until the modal is submitted or the view stops, at most until expiry."""
+        try:
+            await asyncio.wait_for(
+                self.item.wait(), max(0.0, self.expires_at + GRACE - monotonic())
+            )
+        except asyncio.TimeoutError:
+            pass
+
+    def close(self) -> None:
+        self.manager.close(self)
+
+    def __enter__(self) -> "Session":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class SessionManager:
+    """Bounds the modals and views waiting on user input.
+
+    Every session gets a timeout, so an abandoned form never keeps its
+    coroutine, modal and context alive. At most ``max_sessions`` are open at
+    once, and ``max_per_guild`` in any one guild, so a single busy guild cannot
+    use up the budget. Read-only views, such as list pages, count against
+    ``max_readonly_per_guild`` instead, so browsing never blocks forms.
+    Closing a session also drops the modal from Pycord's modal store, which
+    otherwise only forgets modals that were submitted.
+    Sessions left open past their timeout are swept on the next open.
+    """
+
+    def __init__(
+        self,
+        modal_store=None,
+        max_sessions: int = 1000,
+        max_per_guild: int = 20,
+        max_readonly_per_guild: int = 20,
+        timeout: float = 300.0,
+    ) -> None:
+        self.modal_store = modal_store
+        self.max_sessions = max_sessions
+        self.max_per_guild = max_per_guild
+        self.max_readonly_per_guild = max_readonly_per_guild
+        self.timeout = timeout
+        self.opened = 0
+        self.expired = 0
+        self.rejected = 0
+        self._sessions: set[Session] = set()
+        self._guilds: dict[int, int] = {}
+        self._readonly: dict[int, int] = {}
+        self._swept = monotonic()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def guilds(self) -> int:
+        """Guilds with at least one open session."""
+        return len(self._guilds.keys() | self._readonly.keys())
+
+    def open(
+        self,
+        item: discord.ui.Modal | discord.ui.View,
+        guild_id: int,
+        user_id: int,
+        timeout: float | None = None,
+        readonly: bool = False,
+    ) -> Session:
+        """Track a modal or view before it is sent, setting its timeout.
+
+        Use the session as a context manager so it is closed however the
+        command ends. ``readonly`` sessions have their own per-guild cap.
+        """
+        now = monotonic()
+        if now - self._swept >= SWEEP_INTERVAL:
+            self.sweep(now)
+
+        if len(self._sessions) >= self.max_sessions:
+            self.rejected += 1
+            raise SessionLimitError(
+                "The bot is handling too many open forms right now. Try again in a minute."
+            )
+        counts = self._readonly if readonly else self._guilds
+        if readonly and counts.get(guild_id, 0) >= self.max_readonly_per_guild:
+            self.rejected += 1
+            raise SessionLimitError(
+                "Too many lists are open in this server. Close one first."
+            )
+        if not readonly and counts.get(guild_id, 0) >= self.max_per_guild:
+            self.rejected += 1
+            raise SessionLimitError(
+                "Too many forms are open in this server. Finish or dismiss one first."
+            )
+
+        item.timeout = timeout or self.timeout
+        session = Session(self, item, guild_id, user_id, now + item.timeout, readonly)
+        self._sessions.add(session)
+        counts[guild_id] = counts.get(guild_id, 0) + 1
+        self.opened += 1
+        return session
+
+    def close(self, session: Session) -> None:
+        if session.closed:
+            return
+        session.closed = True
+        if monotonic() >= session.expires_at:
+            self.expired += 1
+
+        item = session.item
+        item.stop()
+        if isinstance(item, discord.ui.Modal) and self.modal_store is not None:
+            try:
+                self.modal_store.remove_modal(item, session.user_id)
+            except KeyError:
+                # Submitted modals are removed by Pycord itself
+                pass
+
+        self._sessions.discard(session)
+        counts = self._readonly if session.readonly else self._guilds
+        remaining = counts[session.guild_id] - 1
+        if remaining:
+            counts[session.guild_id] = remaining
+        else:
+            del counts[session.guild_id]
+
+    def sweep(self, now: float | None = None) -> int:
+        """Close sessions that outlived their timeout and return how many."""
+        now = monotonic() if now is None else now
+        self._swept = now
+        stale = [
+            session
+            for session in self._sessions
+            if now >= session.expires_at + GRACE
+            or (isinstance(session.item, discord.ui.View) and session.item.is_finished())
+        ]
+        for session in stale:
+            session.close()
+        return len(stale)
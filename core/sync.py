@@ -0,0 +1,125 @@
+import hashlib
+import json
+import logging
+import os
+
+import discord
+
+__all__ = ("CommandSync", "command_hash")
+
+logger = logging.getLogger(__name__)
+
+
+def command_hash(payload: dict) -> str:
+    """Stable hash of a command's registration payload."""
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def command_key(payload: dict) -> str:
+    # Slash, user and message commands may share a name
+    return f"{payload.get('type', 1)}:{payload['name']}"
+
+
+class CommandSync:
+    """Registers global application commands, sending only what changed.
+
+    The ID and payload hash of every registered command are stored in ``path``
+    per application, so a sync with unchanged commands makes no requests at
+    all. Without stored state, the application's commands are fetched once to
+    find their IDs and every local command is registered again.
+
+    ``http`` only needs the ``get_global_commands``, ``upsert_global_command``
+    and ``delete_global_command`` coroutines of :class:`discord.http.HTTPClient`.
+    """
+
+    def __init__(self, http, application_id: int, path: str) -> None:
+        self.http = http
+        self.application_id = application_id
+        self.path = path
+
+    def load(self) -> dict[str, dict]:
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        return state.get(str(self.application_id), {})
+
+    def save(self, commands: dict[str, dict]) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            state = {}
+        state[str(self.application_id)] = commands
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(state, file, indent=2, sort_keys=True)
+        os.replace(temporary, self.path)
+
+    async def sync(
+        self, commands: list, delete_existing: bool = True
+    ) -> dict[str, list[str]]:
+        """Register ``commands`` and set their IDs, returning what was done."""
+        stored = self.load()
+        if not stored:
+            remote = await self.http.get_global_commands(self.application_id)
+            stored = {
+                command_key(command): {"id": command["id"], "hash": None}
+                for command in remote
+            }
+
+        changes: dict[str, list[str]] = {
+            "created": [],
+            "updated": [],
+            "deleted": [],
+            "unchanged": [],
+        }
+        synced: dict[str, dict] = {}
+        try:
+            for command in commands:
+                payload = command.to_dict()
+                key = command_key(payload)
+                digest = command_hash(payload)
+                entry = stored.pop(key, None)
+
+                if entry is not None and entry["hash"] == digest:
+                    changes["unchanged"].append(command.name)
+                else:
+                    # Upserting by name keeps the ID of an existing command
+                    registered = await self.http.upsert_global_command(
+                        self.application_id, payload
+                    )
+                    changes["created" if entry is None else "updated"].append(
+                        command.name
+                    )
+                    entry = {"id": registered["id"], "hash": digest}
+
+                command.id = entry["id"]
+                synced[key] = entry
+
+            for key, entry in list(stored.items()):
+                if not delete_existing:
+                    synced[key] = entry
+                    continue
+
+                try:
+                    await self.http.delete_global_command(
+                        self.application_id, entry["id"]
+                    )
+                except discord.NotFound:
+                    pass
+                changes["deleted"].append(key.split(":", 1)[1])
+                del stored[key]
+        finally:
+            # Keep what was registered even if a later request failed
+            self.save({**stored, **synced})
+
+        logger.info(
+            "Synced application commands: %s",
+            ", ".join(f"{len(names)} {action}" for action, names in changes.items()),
+        )
+        return changes
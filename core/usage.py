@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from time import time
+
+from tortoise import connections
+from tortoise.transactions import in_transaction
+
+from .models import CommandUsage
+
+__all__ = ("UsageTracker",)
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT statement, well below the bound parameter limits
+BATCH_SIZE = 500
+
+
+class UsageTracker:
+    """Collects custom command invocations in memory and writes them in bulk.
+
+    Recording a trigger only bumps an in-memory counter. :meth:`flush` writes
+    every pending increment with one multi-row upsert, so the write load is one
+    statement per interval no matter how busy the guilds are. Renames and
+    deletes wait for a flush in progress, so they never race its upsert.
+    """
+
+    def __init__(self) -> None:
+        self._pending: dict[tuple[int, str], list] = {}
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def record(self, guild_id: int, command_name: str) -> None:
+        entry = self._pending.get((guild_id, command_name))
+        if entry is None:
+            self._pending[guild_id, command_name] = [1, time()]
+        else:
+            entry[0] += 1
+            entry[1] = time()
+
+    def pending(self, guild_id: int) -> dict[str, tuple[int, datetime]]:
+        """Uses of a guild's commands not written yet, with the last use."""
+        return {
+            command_name: (uses, datetime.fromtimestamp(used_at, timezone.utc))
+            for (pending_guild, command_name), (uses, used_at) in self._pending.items()
+            if pending_guild == guild_id
+        }
+
+    async def rename(self, guild_id: int, old_name: str, new_name: str) -> None:
+        """Carry a renamed command's usage over to its new name.
+
+        Usage left under the new name belongs to a deleted command and is
+        replaced, so the rename cannot hit the unique constraint.
+        """
+        async with self._lock:
+            entry = self._pending.pop((guild_id, old_name), None)
+            if entry is None:
+                self._pending.pop((guild_id, new_name), None)
+            else:
+                self._pending[guild_id, new_name] = entry
+
+            async with in_transaction("default") as transaction:
+                await CommandUsage.filter(
+                    discord_guild_id=guild_id, command_name=new_name
+                ).using_db(transaction).delete()
+                await CommandUsage.filter(
+                    discord_guild_id=guild_id, command_name=old_name
+                ).using_db(transaction).update(command_name=new_name)
+
+    async def discard(self, guild_id: int, command_name: str) -> None:
+        """Forget the usage of a deleted command."""
+        async with self._lock:
+            self._pending.pop((guild_id, command_name), None)
+            await CommandUsage.filter(
+                discord_guild_id=guild_id, command_name=command_name
+            ).delete()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        rows = [
+            (guild_id, command_name, uses, datetime.fromtimestamp(used_at, timezone.utc))
+            for (guild_id, command_name), (uses, used_at) in pending.items()
+        ]
+
+        connection = connections.get("default")
+        sqlite = connection.capabilities.dialect == "sqlite"
+        try:
+            async with in_transaction("default") as transaction:
+                for start in range(0, len(rows), BATCH_SIZE):
+                    batch = rows[start : start + BATCH_SIZE]
+                    await transaction.execute_query(
+                        upsert_sql(len(batch), sqlite),
+                        [value for row in batch for value in row],
+                    )
+        except Exception:
+            # Keep the counts for the next attempt rather than losing them
+            for key, (uses, used_at) in pending.items():
+                entry = self._pending.setdefault(key, [0, used_at])
+                entry[0] += uses
+                entry[1] = max(entry[1], used_at)
+            raise
+
+        logger.debug("Flushed usage for %d commands", len(rows))
+
+
+def upsert_sql(rows: int, sqlite: bool) -> str:
+    if sqlite:
+        values = ", ".join(["(?, ?, ?, ?)"] * rows)
+    else:
+        values = ", ".join(
+            f"(${n + 1}, ${n + 2}, ${n + 3}, ${n + 4})" for n in range(0, rows * 4, 4)
+        )
+
+    table = CommandUsage._meta.db_table
+    return (
+        f"INSERT INTO {table} (discord_guild_id, command_name, uses, last_used_at) "
+        f"VALUES {values} "
+        "ON CONFLICT (discord_guild_id, command_name) DO UPDATE SET "
+        f"uses = {table}.uses + excluded.uses, "
+        "last_used_at = excluded.last_used_at"
+    )
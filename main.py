@@ -1,8 +1,17 @@
+# Taken before the other imports so cold-start time includes them
+from time import perf_counter
+
+launched_at = perf_counter()
+
 from argparse import ArgumentParser
+import asyncio
 from dotenv import load_dotenv
 import logging
 
-from core import Banshee
+from core import AutoShardedBanshee, Banshee
+from core.cluster import ClusterLauncher, run_cluster, run_fake_cluster
+from core.log import LoggerFilter, start_queue_logging
+from core.loop import use_uvloop
 
 
 if __name__ == "__main__":
@@ -21,32 +30,129 @@ if __name__ == "__main__":
         action="store_true",
         help="synchronize commands",
     )
+    parser.add_argument(
+        "--migrate",
+        action="store_true",
+        help="create or migrate database tables and exit",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        help="total shard count (0 lets Discord recommend one)",
+    )
+    parser.add_argument(
+        "--clusters",
+        type=int,
+        default=1,
+        help="spread the shards across this many worker processes",
+    )
+    parser.add_argument(
+        "--fake-gateway",
+        action="store_true",
+        help="run the cluster launcher with workers that fake a gateway connection",
+    )
+    parser.add_argument(
+        "--lean",
+        action="store_true",
+        help="disable member and message caches that prefix triggers do not need",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="log resident memory and cache sizes every minute",
+    )
+    parser.add_argument(
+        "--watch-loop",
+        action="store_true",
+        help="measure event loop lag and log the stack of whatever blocks it",
+    )
+    parser.add_argument(
+        "--profile-queries",
+        action="store_true",
+        help="log handlers that run too many or too slow queries (on with --debug)",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="reload extensions when their files change (development)",
+    )
+    parser.add_argument(
+        "--uvloop",
+        action="store_true",
+        help="run on uvloop when it is installed",
+    )
     args = parser.parse_args()
     debug = args.cogs is not None
+    profile_queries = args.profile_queries or debug
+
+    if (args.clusters > 1 or args.fake_gateway) and not args.shards:
+        parser.error("--clusters and --fake-gateway need an explicit --shards count")
 
     load_dotenv(".env")
 
-    # Configure discord library logging (file only)
-    discord_logger = logging.getLogger("discord")
-    discord_logger.setLevel(logging.DEBUG if debug else logging.INFO)
-    file_handler = logging.FileHandler(
-        filename="discord.log", encoding="utf-8", mode="w"
-    )
-    file_handler.formatter = logging.Formatter(
+    # Log records are queued and written by a background thread, so file and
+    # console I/O never run on the event loop
+    formatter = logging.Formatter(
         "[%(asctime)s %(levelname)s] %(name)s: %(message)s",
         "%d/%m/%y %H:%M:%S",
     )
-    discord_logger.addHandler(file_handler)
 
-    # Configure cogs logging (console output for debugging)
-    cogs_logger = logging.getLogger("cogs")
-    cogs_logger.setLevel(logging.DEBUG if debug else logging.INFO)
+    # Discord library logging goes to a file only
+    file_handler = logging.FileHandler(
+        filename="discord.log", encoding="utf-8", mode="w"
+    )
+    file_handler.setFormatter(formatter)
+    file_handler.addFilter(LoggerFilter("discord"))
+
+    # Cogs and core startup messages (database, caches) go to the console
     console_handler = logging.StreamHandler()
-    console_handler.setFormatter(logging.Formatter(
-        "[%(asctime)s %(levelname)s] %(name)s: %(message)s",
-        "%d/%m/%y %H:%M:%S",
-    ))
-    cogs_logger.addHandler(console_handler)
+    console_handler.setFormatter(formatter)
+    console_handler.addFilter(LoggerFilter("cogs", "core"))
+
+    log_listener = start_queue_logging(
+        [file_handler, console_handler],
+        loggers=("discord", "cogs", "core"),
+        level=logging.DEBUG if debug else logging.INFO,
+        # None of the formats above include thread or process details
+        thread_info=False,
+    )
+
+    try:
+        if args.uvloop:
+            use_uvloop()
 
-    bot = Banshee()
-    bot.run(debug=debug, cogs=args.cogs, sync=args.sync)
\ No newline at end of file
+        if args.migrate:
+            asyncio.run(Banshee().migrate())
+        elif args.clusters > 1 or args.fake_gateway:
+            launcher = ClusterLauncher(
+                args.shards,
+                args.clusters,
+                options={
+                    "debug": debug,
+                    "cogs": args.cogs,
+                    "sync": args.sync,
+                    "lean": args.lean,
+                    "profile_memory": args.profile_memory,
+                    "watch_loop": args.watch_loop,
+                    "profile_queries": profile_queries,
+                    "uvloop": args.uvloop,
+                },
+                target=run_fake_cluster if args.fake_gateway else run_cluster,
+            )
+            launcher.run()
+        else:
+            options = {
+                "launched_at": launched_at,
+                "lean": args.lean,
+                "profile_memory": args.profile_memory,
+                "watch_loop": args.watch_loop,
+                "watch": args.watch,
+                "profile_queries": profile_queries,
+            }
+            if args.shards is not None:
+                bot = AutoShardedBanshee(shard_count=args.shards or None, **options)
+            else:
+                bot = Banshee(**options)
+            bot.run(debug=debug, cogs=args.cogs, sync=args.sync)
+    finally:
+        log_listener.stop()
@@ -0,0 +1,16 @@
+import unittest
+
+from tortoise import Tortoise
+
+from core.database import build_config
+
+
+class DatabaseTestCase(unittest.IsolatedAsyncioTestCase):
+    """Runs each test against a fresh in-memory SQLite database."""
+
+    async def asyncSetUp(self):
+        await Tortoise.init(config=build_config("sqlite://:memory:"))
+        await Tortoise.generate_schemas()
+
+    async def asyncTearDown(self):
+        await Tortoise.close_connections()
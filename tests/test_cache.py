@@ -0,0 +1,113 @@
+from unittest import mock
+
+from core import CustomCommand
+from core.cache import CommandCache
+
+from .database import DatabaseTestCase
+
+
+class CommandCacheTest(DatabaseTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        await CustomCommand.bulk_create(
+            [
+                CustomCommand(
+                    discord_guild_id=guild_id,
+                    command_name=name,
+                    content=f"{guild_id} {name}",
+                    created_by=0,
+                )
+                for guild_id in (1, 2, 3)
+                for name in ("rules", "loot", "raid")
+            ]
+        )
+
+    async def content(self, cache, guild_id, name):
+        reply = await cache.get(guild_id, name)
+        return None if reply is None else "".join(reply.chunks)
+
+    async def test_load_caches_every_guild(self):
+        cache = CommandCache()
+        await cache.load()
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(await self.content(cache, 2, "loot"), "2 loot")
+        self.assertEqual(await cache.names(3), {"rules", "loot", "raid"})
+
+    async def test_load_reads_across_pages(self):
+        cache = CommandCache()
+        with mock.patch("core.cache.LOAD_PAGE_SIZE", 2):
+            await cache.load()
+        self.assertEqual(
+            {guild_id: await cache.names(guild_id) for guild_id in (1, 2, 3)},
+            {guild_id: {"rules", "loot", "raid"} for guild_id in (1, 2, 3)},
+        )
+
+    async def test_load_skips_guilds_not_owned(self):
+        cache = CommandCache(owns=lambda guild_id: guild_id != 2)
+        await cache.load()
+        self.assertNotIn(2, cache)
+        self.assertEqual(await cache.names(2), set())
+
+    async def test_unknown_names_are_rejected_without_queries(self):
+        cache = CommandCache()
+        await cache.load()
+        with mock.patch.object(CustomCommand, "filter") as query:
+            self.assertIsNone(await cache.get(1, "missing"))
+            self.assertIsNone(await cache.get(99, "rules"))
+        query.assert_not_called()
+        self.assertEqual(cache.rejects, 2)
+
+    async def test_eviction_keeps_names_and_reloads_content(self):
+        cache = CommandCache(max_guilds=1)
+        with mock.patch("core.cache.LOAD_PAGE_SIZE", 2):
+            await cache.load()
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(await cache.names(1), {"rules", "loot", "raid"})
+        self.assertEqual(await self.content(cache, 1, "rules"), "1 rules")
+        self.assertIn(1, cache)
+
+    async def test_size_limit_evicts_least_recently_used(self):
+        cache = CommandCache()
+        await cache.load()
+        await cache.get(1, "rules")
+        cache.max_bytes = cache.size - 1
+        cache.set(3, "rules", "3 rules")
+        self.assertNotIn(2, cache)
+        self.assertIn(1, cache)
+
+    async def test_misses_are_remembered_before_load(self):
+        cache = CommandCache()
+        self.assertIsNone(await cache.get(1, "missing"))
+        self.assertEqual(cache.misses, 1)
+        self.assertIsNone(await cache.get(1, "missing"))
+        self.assertEqual(cache.rejects, 1)
+        self.assertEqual(await self.content(cache, 1, "rules"), "1 rules")
+
+    async def test_set_and_remove_write_through(self):
+        cache = CommandCache()
+        await cache.load()
+        self.assertEqual(await cache.complete(1, "r"), ["raid", "rules"])
+
+        cache.set(1, "roster", "1 roster")
+        cache.remove(1, "raid")
+        self.assertEqual(await self.content(cache, 1, "roster"), "1 roster")
+        self.assertIsNone(await cache.get(1, "raid"))
+        self.assertEqual(await cache.complete(1, "r"), ["roster", "rules"])
+
+    async def test_set_renders_long_content_once(self):
+        cache = CommandCache()
+        await cache.load()
+        cache.set(1, "guide", "word " * 1000)
+        cache.set(2, "guide", "word " * 1000)
+        first = await cache.get(1, "guide")
+        self.assertEqual(len(first.chunks), 3)
+        self.assertIs(await cache.get(2, "guide"), first)
+
+    async def test_forget_drops_the_guild(self):
+        cache = CommandCache()
+        await cache.load()
+        size = cache.size
+        cache.forget(1)
+        self.assertNotIn(1, cache)
+        self.assertLess(cache.size, size)
+        self.assertIsNone(await cache.get(1, "rules"))
@@ -0,0 +1,66 @@
+import unittest
+from unittest import mock
+
+from core.ratelimit import Limits, ReplyLimiter
+
+
+class ReplyLimiterTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.limiter = ReplyLimiter()
+        self.now = 1000.0
+        patcher = mock.patch("core.ratelimit.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def acquire(self, guild=1, channel=10, user=100, name="rules"):
+        return await self.limiter.acquire(guild, channel, user, name)
+
+    async def test_user_bucket_limits_replies(self):
+        self.limiter.configure(1, Limits(2, 0, 0, 0))
+        results = [await self.acquire(name=f"c{index}") for index in range(3)]
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(self.limiter.throttled, 1)
+
+    async def test_bucket_refills_over_a_minute(self):
+        self.limiter.configure(1, Limits(2, 0, 0, 0))
+        await self.acquire(name="a")
+        await self.acquire(name="b")
+        self.assertFalse(await self.acquire(name="c"))
+        self.now += 30
+        self.assertTrue(await self.acquire(name="d"))
+
+    async def test_user_buckets_are_per_guild(self):
+        self.limiter.configure(1, Limits(2, 0, 0, 0))
+        self.limiter.configure(2, Limits(100, 0, 0, 0))
+        await self.acquire(guild=1, name="a")
+        await self.acquire(guild=1, name="b")
+        self.assertFalse(await self.acquire(guild=1, name="c"))
+
+        results = [
+            await self.acquire(guild=2, channel=20, name=f"c{index}")
+            for index in range(3)
+        ]
+        self.assertEqual(results, [True, True, True])
+
+    async def test_failed_scope_consumes_no_tokens(self):
+        self.limiter.configure(1, Limits(5, 1, 0, 0))
+        self.assertTrue(await self.acquire(name="a"))
+        self.assertFalse(await self.acquire(name="b"))
+        # The channel is exhausted, but the user's token was not spent
+        self.assertTrue(await self.acquire(channel=11, name="c"))
+
+    async def test_duplicate_trigger_is_collapsed(self):
+        self.limiter.configure(1, Limits(0, 0, 0, 10))
+        self.assertTrue(await self.acquire())
+        self.assertFalse(await self.acquire())
+        self.assertTrue(await self.acquire(channel=11))
+        self.now += 10
+        self.assertTrue(await self.acquire())
+        self.assertEqual(self.limiter.collapsed, 1)
+
+    async def test_sweep_drops_idle_buckets(self):
+        self.limiter.configure(1, Limits(5, 15, 60, 10))
+        await self.acquire()
+        self.assertEqual(len(self.limiter), 3)
+        self.limiter.sweep(self.now + 60)
+        self.assertEqual(len(self.limiter), 0)
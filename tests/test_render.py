@@ -0,0 +1,84 @@
+import unittest
+
+from core.render import (
+    MESSAGE_LIMIT,
+    PayloadCache,
+    fence_state,
+    format_seconds,
+    split_message,
+)
+
+
+class FenceStateTest(unittest.TestCase):
+    def test_opening_fence_keeps_its_language(self):
+        self.assertEqual(fence_state("text\n```py\ncode", None), "py")
+
+    def test_closing_fence_ends_the_block(self):
+        self.assertIsNone(fence_state("code\n```\ntext", "py"))
+
+    def test_inline_fence_is_neutral(self):
+        self.assertIsNone(fence_state("```inline``` text", None))
+        self.assertEqual(fence_state("```inline```", "py"), "py")
+
+    def test_only_short_identifiers_are_languages(self):
+        self.assertEqual(fence_state("```" + "x" * 3000, None), "")
+        self.assertEqual(fence_state("```py title=demo", None), "py")
+
+
+class SplitMessageTest(unittest.TestCase):
+    def assertChunks(self, chunks, limit=MESSAGE_LIMIT):
+        self.assertTrue(all(len(chunk) <= limit for chunk in chunks))
+        # Every message but the last renders with its code blocks closed
+        for chunk in chunks[:-1]:
+            self.assertIsNone(fence_state(chunk, None), chunk[-40:])
+
+    def test_short_content_is_one_message(self):
+        self.assertEqual(split_message("hello"), ["hello"])
+
+    def test_splits_at_line_breaks(self):
+        content = "\n".join(f"line {index}" for index in range(500))
+        chunks = split_message(content, 200)
+        self.assertChunks(chunks, 200)
+        self.assertTrue(all(not chunk.startswith("\n") for chunk in chunks))
+        self.assertEqual("\n".join(chunks), content)
+
+    def test_splits_long_words(self):
+        chunks = split_message("x" * 4500)
+        self.assertChunks(chunks)
+        self.assertEqual("".join(chunks), "x" * 4500)
+
+    def test_reopens_code_blocks_with_their_language(self):
+        content = "```py\n" + "print('hello')\n" * 300 + "```\ndone"
+        chunks = split_message(content)
+        self.assertGreater(len(chunks), 1)
+        self.assertChunks(chunks)
+        for chunk in chunks[1:]:
+            self.assertTrue(chunk.startswith("```py\n"))
+
+    def test_long_fence_line_stays_within_the_limit(self):
+        self.assertChunks(split_message("```" + "x " * 2100))
+        self.assertChunks(split_message("```py\n" + "y" * 4100))
+
+    def test_rejects_limits_too_small_for_a_fence(self):
+        with self.assertRaises(ValueError):
+            split_message("x" * 100, 20)
+
+
+class PayloadCacheTest(unittest.TestCase):
+    def test_identical_content_shares_a_reply(self):
+        payloads = PayloadCache()
+        first = payloads.render("hello")
+        self.assertIs(payloads.render("hello"), first)
+        self.assertEqual((payloads.hits, payloads.renders), (1, 1))
+
+    def test_unused_replies_are_dropped(self):
+        payloads = PayloadCache()
+        payloads.render("hello")
+        self.assertEqual(len(payloads), 0)
+
+
+class FormatSecondsTest(unittest.TestCase):
+    def test_units(self):
+        self.assertEqual(format_seconds(0.0000425), "42µs")
+        self.assertEqual(format_seconds(0.0125), "12.5ms")
+        self.assertEqual(format_seconds(2.5), "2.50s")
@@ -0,0 +1,76 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from core import Announcement, GuildSettings
+from core.scheduler import AnnouncementScheduler, next_run_after
+
+from .database import DatabaseTestCase
+
+NOW = datetime(2025, 1, 6, 12, 0, tzinfo=timezone.utc)
+
+
+async def send(channel_id, content):
+    return True
+
+
+class AnnouncementSchedulerTest(DatabaseTestCase):
+    async def announce(self, guild_id, next_run_at, interval_minutes=60):
+        settings, _ = await GuildSettings.get_or_create(discord_guild_id=guild_id)
+        return await Announcement.create(
+            guild=settings,
+            channel_id=guild_id * 10,
+            content="raid tonight",
+            interval_minutes=interval_minutes,
+            next_run_at=next_run_at,
+            created_by=0,
+        )
+
+    async def test_missed_runs_are_coalesced_and_persisted(self):
+        announcement = await self.announce(1, NOW - timedelta(minutes=150))
+        scheduler = AnnouncementScheduler(send)
+
+        due = await scheduler.tick(NOW.timestamp())
+        self.assertEqual([job.id for job in due], [announcement.id])
+        self.assertEqual(scheduler.coalesced, 2)
+
+        await announcement.refresh_from_db()
+        self.assertEqual(announcement.next_run_at, NOW + timedelta(minutes=30))
+        self.assertEqual(announcement.last_run_at, NOW)
+
+        # A restart picks up the stored time and does not post again
+        restarted = AnnouncementScheduler(send)
+        self.assertEqual(await restarted.tick(NOW.timestamp()), [])
+
+    async def test_only_due_and_owned_announcements_run(self):
+        await self.announce(1, NOW - timedelta(minutes=1))
+        await self.announce(2, NOW - timedelta(minutes=1))
+        later = await self.announce(3, NOW + timedelta(minutes=5))
+        scheduler = AnnouncementScheduler(send, owns=lambda guild_id: guild_id != 2)
+
+        due = await scheduler.tick(NOW.timestamp())
+        self.assertEqual([job.guild_id for job in due], [1])
+        self.assertIn(later.id, scheduler._jobs)
+
+        due = await scheduler.tick((NOW + timedelta(minutes=5)).timestamp())
+        self.assertEqual([job.id for job in due], [later.id])
+
+    async def test_unscheduled_jobs_are_skipped(self):
+        announcement = await self.announce(1, NOW + timedelta(minutes=1))
+        scheduler = AnnouncementScheduler(send)
+        await scheduler.tick(NOW.timestamp())
+        scheduler.unschedule(announcement.id)
+        self.assertEqual(
+            await scheduler.tick((NOW + timedelta(minutes=2)).timestamp()), []
+        )
+
+
+class NextRunAfterTest(unittest.TestCase):
+    def test_future_start_is_kept(self):
+        start = NOW + timedelta(hours=1)
+        self.assertEqual(next_run_after(start, timedelta(days=7), NOW), start)
+
+    def test_past_start_moves_to_the_next_interval(self):
+        start = NOW - timedelta(days=8)
+        self.assertEqual(
+            next_run_after(start, timedelta(days=7), NOW), NOW + timedelta(days=6)
+        )
@@ -0,0 +1,73 @@
+import asyncio
+import unittest
+from unittest import mock
+
+import discord
+from discord.ui.modal import ModalStore
+
+from core.sessions import GRACE, SessionLimitError, SessionManager
+
+
+class SessionManagerTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("core.sessions.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_caps_reject_new_sessions(self):
+        sessions = SessionManager(max_sessions=3, max_per_guild=2)
+        sessions.open(discord.ui.View(), 1, 1)
+        sessions.open(discord.ui.View(), 1, 2)
+        with self.assertRaises(SessionLimitError):
+            sessions.open(discord.ui.View(), 1, 3)
+        sessions.open(discord.ui.View(), 2, 3)
+        with self.assertRaises(SessionLimitError):
+            sessions.open(discord.ui.View(), 3, 4)
+        self.assertEqual((len(sessions), sessions.guilds, sessions.rejected), (3, 2, 2))
+
+    async def test_readonly_sessions_have_their_own_cap(self):
+        sessions = SessionManager(max_per_guild=1, max_readonly_per_guild=1)
+        sessions.open(discord.ui.View(), 1, 1, readonly=True)
+        with self.assertRaises(SessionLimitError):
+            sessions.open(discord.ui.View(), 1, 2, readonly=True)
+        sessions.open(discord.ui.Modal(title="Create"), 1, 2)
+        self.assertEqual(sessions.guilds, 1)
+
+    async def test_stopping_the_view_releases_the_slot(self):
+        sessions = SessionManager(max_per_guild=1)
+        view = discord.ui.View()
+
+        async def wait():
+            with sessions.open(view, 1, 1) as session:
+                await session.wait()
+
+        task = asyncio.create_task(wait())
+        await asyncio.sleep(0)
+        view.stop()
+        await task
+        self.assertEqual(len(sessions), 0)
+        sessions.open(discord.ui.View(), 1, 1)
+
+    async def test_closing_drops_the_modal_from_the_store(self):
+        store = ModalStore(None)
+        sessions = SessionManager(store)
+        modal = discord.ui.Modal(title="Create")
+        session = sessions.open(modal, 1, 7, timeout=600)
+        store.add_modal(modal, 7)
+
+        session.close()
+        self.assertEqual(store._modals, {})
+        self.assertEqual(modal.timeout, 600)
+        # Closing again, or a modal Pycord already removed, is harmless
+        session.close()
+        sessions.open(discord.ui.Modal(title="Edit"), 1, 7).close()
+
+    async def test_sweep_closes_expired_sessions(self):
+        sessions = SessionManager(timeout=60)
+        sessions.open(discord.ui.Modal(title="Create"), 1, 1)
+        self.now += 60
+        self.assertEqual(sessions.sweep(), 0)
+        self.now += GRACE
+        self.assertEqual(sessions.sweep(), 1)
+        self.assertEqual((len(sessions), sessions.expired), (0, 1))
@@ -0,0 +1,72 @@
+import tempfile
+import unittest
+
+from core.sync import CommandSync
+
+
+class FakeCommand:
+    def __init__(self, name: str, description: str = "A command") -> None:
+        self.name = name
+        self.description = description
+        self.id = None
+
+    def to_dict(self) -> dict:
+        return {"type": 1, "name": self.name, "description": self.description}
+
+
+class FakeHTTP:
+    def __init__(self, remote: list[dict] | None = None) -> None:
+        self.remote = remote or []
+        self.requests: list[tuple[str, str]] = []
+
+    async def get_global_commands(self, application_id):
+        self.requests.append(("get", ""))
+        return self.remote
+
+    async def upsert_global_command(self, application_id, payload):
+        self.requests.append(("upsert", payload["name"]))
+        return {"id": f"id-{payload['name']}"}
+
+    async def delete_global_command(self, application_id, command_id):
+        self.requests.append(("delete", command_id))
+
+
+class CommandSyncTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f"{directory.name}/command_hashes.json"
+
+    async def sync(self, http, commands, **kwargs):
+        return await CommandSync(http, 1, self.path).sync(commands, **kwargs)
+
+    async def test_unchanged_commands_make_no_requests(self):
+        await self.sync(FakeHTTP(), [FakeCommand("stats"), FakeCommand("reload")])
+
+        http = FakeHTTP()
+        commands = [FakeCommand("stats"), FakeCommand("reload")]
+        changes = await self.sync(http, commands)
+        self.assertEqual(http.requests, [])
+        self.assertEqual(changes["unchanged"], ["stats", "reload"])
+        self.assertEqual([command.id for command in commands], ["id-stats", "id-reload"])
+
+    async def test_only_changed_and_removed_commands_are_sent(self):
+        await self.sync(FakeHTTP(), [FakeCommand("stats"), FakeCommand("reload")])
+
+        http = FakeHTTP()
+        changes = await self.sync(
+            http, [FakeCommand("stats", "New description"), FakeCommand("settings")]
+        )
+        self.assertEqual(
+            http.requests,
+            [("upsert", "stats"), ("upsert", "settings"), ("delete", "id-reload")],
+        )
+        self.assertEqual(changes["updated"], ["stats"])
+        self.assertEqual(changes["created"], ["settings"])
+        self.assertEqual(changes["deleted"], ["reload"])
+
+    async def test_without_state_remote_ids_are_reused(self):
+        http = FakeHTTP([{"id": "old", "type": 1, "name": "stats"}])
+        changes = await self.sync(http, [FakeCommand("stats")], delete_existing=False)
+        self.assertEqual(http.requests, [("get", ""), ("upsert", "stats")])
+        self.assertEqual(changes["updated"], ["stats"])
@@ -0,0 +1,87 @@
+import asyncio
+
+from core import CommandUsage
+from core.usage import UsageTracker
+
+from .database import DatabaseTestCase
+
+
+class UsageTrackerTest(DatabaseTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.usage = UsageTracker()
+
+    async def uses(self, guild_id=1):
+        return dict(
+            await CommandUsage.filter(discord_guild_id=guild_id).values_list(
+                "command_name", "uses"
+            )
+        )
+
+    async def test_flush_adds_to_stored_counts(self):
+        for _ in range(3):
+            self.usage.record(1, "rules")
+        self.usage.record(2, "rules")
+        await self.usage.flush()
+        self.assertEqual(len(self.usage), 0)
+
+        self.usage.record(1, "rules")
+        await self.usage.flush()
+        self.assertEqual(await self.uses(1), {"rules": 4})
+        self.assertEqual(await self.uses(2), {"rules": 1})
+
+    async def test_flush_keeps_counts_when_the_write_fails(self):
+        self.usage.record(1, "rules")
+        await CommandUsage.raw(f"DROP TABLE {CommandUsage._meta.db_table}")
+        with self.assertRaises(Exception):
+            await self.usage.flush()
+        self.assertEqual(self.usage.pending(1)["rules"][0], 1)
+
+    async def test_pending_lists_one_guild(self):
+        self.usage.record(1, "rules")
+        self.usage.record(1, "rules")
+        self.usage.record(2, "loot")
+        self.assertEqual(
+            {name: uses for name, (uses, _) in self.usage.pending(1).items()},
+            {"rules": 2},
+        )
+
+    async def test_rename_moves_stored_and_pending_counts(self):
+        self.usage.record(1, "rules")
+        await self.usage.flush()
+        self.usage.record(1, "rules")
+
+        await self.usage.rename(1, "rules", "guide")
+        self.assertEqual(await self.uses(), {"guide": 1})
+        await self.usage.flush()
+        self.assertEqual(await self.uses(), {"guide": 2})
+
+    async def test_rename_replaces_stale_usage_under_the_new_name(self):
+        self.usage.record(1, "rules")
+        self.usage.record(1, "guide")
+        self.usage.record(1, "guide")
+        await self.usage.flush()
+        self.usage.record(1, "guide")
+
+        await self.usage.rename(1, "rules", "guide")
+        await self.usage.flush()
+        self.assertEqual(await self.uses(), {"guide": 1})
+
+    async def test_rename_waits_for_a_flush_in_progress(self):
+        self.usage.record(1, "rules")
+        await self.usage.flush()
+        self.usage.record(1, "rules")
+
+        await asyncio.gather(
+            self.usage.flush(), self.usage.rename(1, "rules", "guide")
+        )
+        self.assertEqual(await self.uses(), {"guide": 2})
+
+    async def test_discard_forgets_stored_and_pending_counts(self):
+        self.usage.record(1, "rules")
+        await self.usage.flush()
+        self.usage.record(1, "rules")
+
+        await self.usage.discard(1, "rules")
+        await self.usage.flush()
+        self.assertEqual(await self.uses(), {})